@@ -0,0 +1,330 @@
+from collections import OrderedDict
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import transaction, router
+from django.db.models import signals
+import threading
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+
+# Per-model in-process caches, keyed by model class
+_local_caches = {}
+
+# Models whose instances invalidate cache entries when saved or deleted
+_connected = set()
+
+# Calls that identical calls may wait on, by key, and the lock
+# that guards them. Calls made by coroutines are keyed by event loop too.
+_flights = {}
+_flights_lock = threading.Lock()
+
+# The `get_many` input that distinguishes one page from another
+PAGE_INPUT = [
+    'filters', 'order_by', 'fields', 'pseudo_fields', 'total_count_mode',
+    'first', 'last', 'after', 'before', 'probe_opposite_page',
+]
+
+
+class LocalCache:
+    '''
+    An in-process cache that forgets entries after their timeout,
+    and forgets the least recently used entries beyond `max_entries`.
+    Offers the parts of Django's cache API that this library uses.
+    '''
+
+    def __init__(self, max_entries = 1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default = None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] <= time.monotonic():
+                del self.entries[key]
+                return default
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, timeout = 60):
+        '''Store a value, forever if `timeout` is None'''
+        expires_at = float('inf') if timeout is None else time.monotonic() + timeout
+        with self.lock:
+            self.entries[key] = (expires_at, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def delete_many(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+def cache_for(model):
+    '''
+    Return the cache a model's payloads are stored in, or None if its
+    `Caching` is disabled. Local caches are created on first use, or
+    again if the model's `Caching` configuration has been replaced.
+    '''
+    config = getattr(model, 'Caching', None)
+    if config is None or not config.enabled:
+        return None
+
+    connect(model)
+
+    if config.backend != 'local':
+        return caches[config.backend]
+
+    local = _local_caches.get(model)
+    if local is None or local[0] is not config:
+        local = (config, LocalCache(config.max_entries))
+        _local_caches[model] = local
+    return local[1]
+
+
+def key(model, *parts):
+    '''Build a cache key for a model, that's unique among models'''
+    return ':'.join(['instant_rest', model._meta.label, *[ str(part) for part in parts ]])
+
+
+def instance_key(model, id):
+    '''
+    Build the cache key of an instance's payload. Ids are normalized
+    first, so that ids given in another form, like uppercase UUIDs,
+    share the key of the instance they refer to.
+    '''
+    try:
+        id = model._meta.pk.to_python(id)
+    except ValidationError:
+        pass
+    return key(model, 'one', id)
+
+
+def generation(model, cache):
+    '''
+    Return the token that cached pages of a model are stored under.
+    Tokens are random, rather than counted, so that a token that was
+    evicted from the cache is never reused for different data.
+    '''
+    generation_key = key(model, 'generation')
+    token = cache.get(generation_key)
+    if token is None:
+        token = uuid.uuid4().hex
+        cache.set(generation_key, token, None)
+    return token
+
+
+def page_digest(input):
+    '''Digest the `get_many` input that distinguishes one page from another'''
+    page = json.dumps({ name: input.get(name) for name in PAGE_INPUT }, sort_keys=True, default=str)
+    return hashlib.sha256(page.encode()).hexdigest()
+
+
+def page_key(model, cache, input):
+    '''Build the cache key of a `get_many` page, for the model's current generation'''
+    return key(model, 'many', generation(model, cache), page_digest(input))
+
+
+def copy_page(payload):
+    '''Copy a page, so that cached pages aren't changed by hooks'''
+    return { **payload, 'nodes': [ dict(node) for node in payload['nodes'] ] }
+
+
+def copy_result(result):
+    '''Copy the result of `get_one` or `get_many`, so that sharers don't change each other's'''
+    payload = result['payload']
+    if payload is None:
+        return { **result }
+    if 'nodes' in payload:
+        return { **result, 'payload': copy_page(payload) }
+    return { **result, 'payload': dict(payload) }
+
+
+class Flight:
+    '''A call that identical calls may wait on, rather than repeat'''
+
+    def __init__(self, owner, done):
+        self.owner = owner
+        self.done = done
+        self.result = None
+        self.error = None
+
+
+def flight_key(model, operation, input):
+    '''Key identical `get_one` or `get_many` calls the way their results are cached'''
+    if operation == 'get_one':
+        return instance_key(model, input.get('id'))
+    return key(model, 'many', page_digest(input))
+
+
+def share(flight_key, fn):
+    '''
+    Call `fn`, unless an identical call is in flight in another thread,
+    in which case wait for that call, and return a copy of its result.
+    '''
+    owner = threading.get_ident()
+    with _flights_lock:
+        flight = _flights.get(flight_key)
+        leading = flight is None
+        if leading:
+            flight = _flights[flight_key] = Flight(owner, threading.Event())
+
+    if not leading:
+        # Calls within the call being waited on can't wait for it
+        if flight.owner == owner:
+            return fn()
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return copy_result(flight.result)
+
+    try:
+        result = fn()
+        flight.result = copy_result(result)
+        return result
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            if _flights.get(flight_key) is flight:
+                del _flights[flight_key]
+        flight.done.set()
+
+
+async def ashare(flight_key, fn):
+    '''
+    Await `fn()`, unless an identical call is in flight in another task
+    of the same event loop, in which case wait for that call, and return
+    a copy of its result.
+    '''
+    owner = asyncio.current_task()
+    loop_key = (id(asyncio.get_running_loop()), flight_key)
+    with _flights_lock:
+        flight = _flights.get(loop_key)
+        leading = flight is None
+        if leading:
+            flight = _flights[loop_key] = Flight(owner, asyncio.Event())
+
+    if not leading:
+        if flight.owner is owner:
+            return await fn()
+        await flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return copy_result(flight.result)
+
+    try:
+        result = await fn()
+        flight.result = copy_result(result)
+        return result
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            if _flights.get(loop_key) is flight:
+                del _flights[loop_key]
+        flight.done.set()
+
+
+def coalesced(model, operation, fn):
+    '''
+    Wrap a `get_one` or `get_many` function, so that identical calls
+    made at the same time share one execution, if the model's `Caching`
+    enables `coalesce`. Async functions are wrapped with `ashare`.
+    '''
+    config = getattr(model, 'Caching', None)
+    if config is None or not config.coalesce:
+        return fn
+
+    connect(model)
+
+    if asyncio.iscoroutinefunction(fn):
+        async def acoalesced_fn(**input):
+            return await ashare(flight_key(model, operation, input), lambda: fn(**input))
+        return acoalesced_fn
+
+    def coalesced_fn(**input):
+        return share(flight_key(model, operation, input), lambda: fn(**input))
+    return coalesced_fn
+
+
+def forget_flights(model):
+    '''Make later calls start afresh, rather than wait on a model's calls in flight'''
+    prefix = key(model, '')
+    with _flights_lock:
+        for flight_key in list(_flights):
+            name = flight_key[1] if type(flight_key) == tuple else flight_key
+            if name.startswith(prefix):
+                del _flights[flight_key]
+
+
+def invalidate(model, ids = ()):
+    '''
+    Forget the cached payloads of the instances with the given ids,
+    and every cached page of the model, by starting a new generation,
+    along with the model's calls in flight. This happens now, and again
+    once the current transaction commits, so that readers can't cache
+    or share data that's about to change.
+    '''
+    cache = cache_for(model)
+    if cache is None and not model.Caching.coalesce:
+        return
+
+    keys = [ instance_key(model, id) for id in ids ]
+
+    def forget():
+        forget_flights(model)
+        if cache is None:
+            return
+        cache.delete_many(keys)
+        if model.Caching.pages:
+            cache.set(key(model, 'generation'), uuid.uuid4().hex, None)
+
+    forget()
+
+    using = router.db_for_write(model)
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(forget, using=using)
+
+
+def invalidate_instance(sender, instance, **kwargs):
+    invalidate(sender, [instance.pk])
+
+
+def connect(model):
+    '''Invalidate a model's cached payloads (and calls in flight) whenever an instance is saved or deleted'''
+    if model in _connected:
+        return
+
+    signals.post_save.connect(invalidate_instance, sender=model, dispatch_uid='instant_rest_cache')
+    signals.post_delete.connect(invalidate_instance, sender=model, dispatch_uid='instant_rest_cache')
+    _connected.add(model)
+
+
+def disconnect(model):
+    '''
+    Undo `connect`, and forget a model's local cache, along with its
+    generations of pages, and its calls in flight. Models are connected
+    again when their `Caching` is next used.
+    '''
+    signals.post_save.disconnect(invalidate_instance, sender=model, dispatch_uid='instant_rest_cache')
+    signals.post_delete.disconnect(invalidate_instance, sender=model, dispatch_uid='instant_rest_cache')
+    _connected.discard(model)
+    _local_caches.pop(model, None)
+    forget_flights(model)
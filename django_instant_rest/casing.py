@@ -1,11 +1,18 @@
 
+from functools import lru_cache
 import re
 
+# Remembering translations, since the same few
+# keys are translated for every object in a list.
+MAX_CACHED_KEYS = 4096
+
 # "snake_case" -> "snakeCase" 
+@lru_cache(maxsize=MAX_CACHED_KEYS)
 def camel(snake_str):
     return "".join(w.capitalize() if i else w for i, w in enumerate(snake_str.split("_")))
 
 # "camelCase" -> "camel_case" 
+@lru_cache(maxsize=MAX_CACHED_KEYS)
 def snake(camel_str):
     return re.sub(r'(?<!^)(?=[A-Z])', '_', camel_str).lower()
 
@@ -27,3 +34,18 @@ def snake_keys(maybe_dict):
     else:
         return maybe_dict
 
+
+def rename_keys(node, key_map, convert=camel):
+    '''
+    Rename the keys of a flat dictionary using a precomputed mapping,
+    translating keys that are missing from it with `convert`.
+    '''
+    result = {}
+    for key, value in node.items():
+        name = key_map.get(key)
+        if name is None:
+            name = convert(key)
+        if type(value) == dict or type(value) == list:
+            value = camel_keys(value) if convert is camel else snake_keys(value)
+        result[name] = value
+    return result
@@ -0,0 +1,83 @@
+from .caching import LocalCache
+from django.db import connections
+import json
+
+COUNT_MODES = ['exact', 'estimated', 'cached']
+
+# Counts remembered by the `cached` mode, keyed by the SQL that
+# produced them, so that each distinct set of filters is memoized.
+MAX_CACHED_COUNTS = 1024
+_cached_counts = LocalCache(MAX_CACHED_COUNTS)
+
+
+def exact_count(queryset):
+    '''Count every row matched by a queryset with COUNT(*)'''
+    return queryset.count(), 'exact'
+
+
+def estimated_count(queryset):
+    '''
+    Ask the database's query planner how many rows a queryset will match.
+    Backends without planner statistics fall back to an exact count,
+    and the returned mode says which of the two was used.
+    '''
+    connection = connections[queryset.db]
+    query = queryset.order_by().values('pk')
+    sql, params = query.query.sql_with_params()
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Unfiltered tables have an up-to-date row estimate in pg_class
+            if not queryset.query.where:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table],
+                )
+                estimate = cursor.fetchone()[0]
+            else:
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+                plan = cursor.fetchone()[0]
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                estimate = plan[0]['Plan']['Plan Rows']
+
+            # Tables that have never been analyzed report a negative estimate
+            if estimate is not None and estimate >= 0:
+                return int(estimate), 'estimated'
+
+        elif connection.vendor == 'mysql':
+            cursor.execute(f'EXPLAIN {sql}', params)
+            columns = [ column[0] for column in cursor.description ]
+            row = dict(zip(columns, cursor.fetchone()))
+            filtered = float(row.get('filtered') or 100)
+            if row.get('rows') is not None:
+                return int(row['rows'] * filtered / 100), 'estimated'
+
+    return exact_count(queryset)
+
+
+def cached_count(queryset, ttl):
+    '''
+    Count every row matched by a queryset, remembering the result for
+    `ttl` seconds. Querysets with the same filters share a cached count.
+    '''
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    key = (queryset.db, sql, repr(params))
+
+    count = _cached_counts.get(key)
+    if count is None:
+        count, _ = exact_count(queryset)
+        _cached_counts.set(key, count, ttl)
+
+    return count, 'cached'
+
+
+def total_count(queryset, mode, ttl = 60):
+    '''
+    Count the rows matched by a queryset using the given mode. Returns
+    the count, along with the mode that was actually used.
+    '''
+    if mode == 'estimated':
+        return estimated_count(queryset)
+    if mode == 'cached':
+        return cached_count(queryset, ttl)
+    return exact_count(queryset)
@@ -22,9 +22,27 @@ INVALID_AFTER_PARAMETER = {
     'is_internal': False,
 }
 
+INVALID_ORDER_BY_PARAMETER = lambda field_name : {
+    'unique_name': 'INVALID_ORDER_BY_PARAMETER',
+    'message': f'Unable to order by field "{field_name}"',
+    'is_internal': False,
+}
+
+INVALID_TOTAL_COUNT_MODE = lambda mode : {
+    'unique_name': 'INVALID_TOTAL_COUNT_MODE',
+    'message': f'Expected `total_count_mode` to be "exact", "estimated" or "cached", not "{mode}"',
+    'is_internal': False,
+}
+
+INVALID_FILTER_PARAMETER = lambda param : {
+    'unique_name': 'INVALID_FILTER_PARAMETER',
+    'message': f'Unable to filter by "{param}"',
+    'is_internal': False,
+}
+
 INVALID_DATE_RECIEVED = lambda field_name : {
     'unique_name': 'INVALID_DATE_RECIEVED',
-    'message': f'Received an invalid date for field "{field}"',
+    'message': f'Received an invalid date for field "{field_name}"',
     'is_internal': False,
 }
 
@@ -53,7 +71,43 @@ PAGINATION_DIRECTION_UNCLEAR = {
 
 PAGINATION_CURSOR_INVALID = {
     'unique_name': 'PAGINATION_CURSOR_INVALID',
-    'message': 'Expected `first` or `last` to be a base-64 encoded string.',
+    'message': 'Expected `before` or `after` to be a cursor from a list with the same ordering.',
+    'is_internal': False,
+}
+
+INVALID_UNIQUE_FIELDS = lambda field_names : {
+    'unique_name': 'INVALID_UNIQUE_FIELDS',
+    'message': f'Expected `unique_fields` to name a unique field, or a set of fields that are unique together. Received {field_names}.',
+    'is_internal': False,
+}
+
+DUPLICATE_UNIQUE_FIELDS = lambda field_names, index : {
+    'unique_name': 'DUPLICATE_UNIQUE_FIELDS',
+    'message': f'Expected the values of {field_names} to differ from those of the object at index {index}.',
+    'is_internal': False,
+}
+
+BULK_OPERATION_REQUIRES_FILTERS = {
+    'unique_name': 'BULK_OPERATION_REQUIRES_FILTERS',
+    'message': 'Expected at least one filter parameter, to select the objects to change.',
+    'is_internal': False,
+}
+
+INVALID_OBJECT_RECEIVED = {
+    'unique_name': 'INVALID_OBJECT_RECEIVED',
+    'message': 'Expected an object of field names and values.',
+    'is_internal': False,
+}
+
+BULK_UPDATE_REQUIRES_FIELDS = {
+    'unique_name': 'BULK_UPDATE_REQUIRES_FIELDS',
+    'message': 'Expected at least one field to update.',
+    'is_internal': False,
+}
+
+TOO_MANY_OBJECTS_AFFECTED = lambda count, limit : {
+    'unique_name': 'TOO_MANY_OBJECTS_AFFECTED',
+    'message': f'The operation would have affected {count} objects, but at most {limit} may be affected at once.',
     'is_internal': False,
 }
 
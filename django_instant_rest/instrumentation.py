@@ -0,0 +1,300 @@
+from contextlib import ExitStack
+from contextvars import ContextVar
+from django.db import connections
+import threading
+import time
+
+# Whether operations are measured at all. Measuring wraps every
+# operation, and every query it makes, so it's opt-in, through
+# `configure(enabled = True)`.
+enabled = False
+
+# Upper bounds of histogram buckets, in seconds and in queries
+SECONDS_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+QUERIES_BUCKETS = [0, 1, 2, 3, 5, 10, 25, 50, 100]
+
+# The measurement of the operation being performed, if any
+_current = ContextVar('instant_rest_measurement', default=None)
+
+
+class Histogram:
+    '''Counts observed values into cumulative buckets'''
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+class MemorySink:
+    '''
+    Keeps histograms and totals of every measurement, by model and
+    operation, and renders them in Prometheus' text exposition format.
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.operations = {}
+
+    def record(self, measurement):
+        key = (measurement.model_label, measurement.operation)
+        with self.lock:
+            stats = self.operations.get(key)
+            if stats is None:
+                stats = {
+                    'seconds': Histogram(SECONDS_BUCKETS),
+                    'queries': Histogram(QUERIES_BUCKETS),
+                    'phases': {},
+                    'rows': 0,
+                    'bytes': 0,
+                    'cache_hits': 0,
+                    'cache_misses': 0,
+                }
+                self.operations[key] = stats
+
+            stats['seconds'].observe(measurement.seconds)
+            stats['queries'].observe(measurement.queries)
+            stats['rows'] += measurement.rows
+            stats['bytes'] += measurement.bytes
+            stats['cache_hits'] += measurement.cache_hits
+            stats['cache_misses'] += measurement.cache_misses
+            for phase, seconds in measurement.phases().items():
+                stats['phases'][phase] = stats['phases'].get(phase, 0) + seconds
+
+    def render(self):
+        lines = []
+
+        def histogram(name, labels, histogram):
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+        with self.lock:
+            for (model_label, operation), stats in sorted(self.operations.items()):
+                labels = f'model="{model_label}",operation="{operation}"'
+                histogram('instant_rest_operation_seconds', labels, stats['seconds'])
+                histogram('instant_rest_operation_queries', labels, stats['queries'])
+                for phase, seconds in sorted(stats['phases'].items()):
+                    lines.append(f'instant_rest_phase_seconds_total{{{labels},phase="{phase}"}} {seconds}')
+                lines.append(f'instant_rest_rows_total{{{labels}}} {stats["rows"]}')
+                lines.append(f'instant_rest_response_bytes_total{{{labels}}} {stats["bytes"]}')
+                lines.append(f'instant_rest_cache_hits_total{{{labels}}} {stats["cache_hits"]}')
+                lines.append(f'instant_rest_cache_misses_total{{{labels}}} {stats["cache_misses"]}')
+
+        return '\n'.join(lines) + '\n'
+
+
+# Where finished measurements are sent
+sink = MemorySink()
+
+
+def configure(enabled = None, sink = None):
+    '''Turn instrumentation on or off, or replace the sink measurements are sent to'''
+    module = globals()
+    if enabled is not None:
+        module['enabled'] = enabled
+    if sink is not None:
+        module['sink'] = sink
+
+
+class Measurement:
+    '''
+    The wall time, database queries, rows, cache lookups and response
+    bytes of a single operation. Time is split into phases, each of which excludes
+    the time its queries spent in the database, which is kept as `query`.
+    '''
+
+    def __init__(self, model, operation, tentative = False):
+        self.model_label = model._meta.label
+        self.operation = operation
+        self.tentative = tentative
+        self.seconds = 0
+        self.query_seconds = 0
+        self.queries = 0
+        self.rows = 0
+        self.bytes = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.phase_seconds = {}
+        self.deferred = False
+        self.thread = None
+        self._started_at = None
+        self._token = None
+        self._wrappers = None
+
+    def attributed_seconds(self):
+        return self.query_seconds + sum(self.phase_seconds.values())
+
+    def phases(self):
+        other = self.seconds - self.query_seconds - sum(self.phase_seconds.values())
+        return { **self.phase_seconds, 'query': self.query_seconds, 'other': max(other, 0) }
+
+    def _execute(self, execute, sql, params, many, context):
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_seconds += time.perf_counter() - started_at
+
+    def resume(self):
+        '''Start, or continue, measuring the current context'''
+        self._token = _current.set(self)
+        self.thread = threading.get_ident()
+        self._wrappers = ExitStack()
+        for connection in connections.all():
+            self._wrappers.enter_context(connection.execute_wrapper(self._execute))
+        self._started_at = time.perf_counter()
+
+    def pause(self):
+        '''Stop measuring, without sending the measurement anywhere'''
+        self.seconds += time.perf_counter() - self._started_at
+        self._wrappers.close()
+        _current.reset(self._token)
+
+    def finish(self):
+        self.pause()
+        sink.record(self)
+
+    def defer(self):
+        '''Keep measuring after the `with` block, until `finish()` is called'''
+        self.deferred = True
+
+    def __enter__(self):
+        self.resume()
+        return self
+
+    def __exit__(self, *args):
+        if self.deferred:
+            self.pause()
+        else:
+            self.finish()
+
+
+class Nested:
+    '''Stands in for measurements of operations inside another operation'''
+
+    def __init__(self, measurement):
+        self.measurement = measurement
+
+    def __enter__(self):
+        return self.measurement
+
+    def __exit__(self, *args):
+        pass
+
+
+class Joined(Nested):
+    '''
+    Stands in for measurements of operations inside another operation,
+    that are performed in another thread, such as by async operations,
+    and counts the queries made by this thread's connections too.
+    '''
+
+    def __enter__(self):
+        self.wrappers = ExitStack()
+        for connection in connections.all():
+            self.wrappers.enter_context(connection.execute_wrapper(self.measurement._execute))
+        return self.measurement
+
+    def __exit__(self, *args):
+        self.wrappers.close()
+
+
+def measure(model, operation, tentative = False):
+    '''
+    Measure an operation on a model. Operations performed within another
+    are counted as part of it, though they name it if its name was only
+    `tentative`. Returns a context manager that gives the measurement,
+    or None if instrumentation is disabled.
+    '''
+    current = _current.get()
+    if current is not None:
+        if current.tentative:
+            current.operation = operation
+            current.tentative = False
+        if current.thread != threading.get_ident():
+            return Joined(current)
+        return Nested(current)
+
+    if not enabled:
+        return Nested(None)
+
+    return Measurement(model, operation, tentative)
+
+
+class phase:
+    '''
+    Attribute the time spent in a block to a phase of the current
+    operation, apart from the time attributed to queries or to other
+    phases within the block.
+    '''
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.measurement = _current.get()
+        if self.measurement is not None:
+            self.started_at = time.perf_counter()
+            self.attributed = self.measurement.attributed_seconds()
+
+    def __exit__(self, *args):
+        m = self.measurement
+        if m is not None:
+            elapsed = time.perf_counter() - self.started_at
+            elapsed -= m.attributed_seconds() - self.attributed
+            m.phase_seconds[self.name] = m.phase_seconds.get(self.name, 0) + elapsed
+
+
+def add_rows(count):
+    '''Count rows fetched by the current operation'''
+    measurement = _current.get()
+    if measurement is not None:
+        measurement.rows += count
+
+
+def count_cache_lookup(hit):
+    '''Count a cache hit, or miss, of the current operation'''
+    measurement = _current.get()
+    if measurement is not None:
+        if hit:
+            measurement.cache_hits += 1
+        else:
+            measurement.cache_misses += 1
+
+
+def stream(measurement, chunks):
+    '''
+    Measure the production of a streamed response's chunks, finishing
+    the measurement once every chunk has been produced.
+    '''
+    try:
+        while True:
+            measurement.resume()
+            try:
+                chunk = next(chunks, None)
+            finally:
+                measurement.pause()
+
+            if chunk is None:
+                break
+
+            measurement.bytes += len(chunk)
+            yield chunk
+
+    finally:
+        sink.record(measurement)
@@ -1,18 +1,110 @@
-from .pagination import paginate, encode_cursor
-from .casing import camel_keys, snake_keys
+from .pagination import paginate, encode_cursor, sort_keys
+from .casing import camel_keys
+from .counting import total_count, COUNT_MODES
+from .serializers import get_serializer
+from .instrumentation import measure, phase, add_rows, count_cache_lookup
+from . import instrumentation
+from . import caching
 from .errors import *
-from django.db import models
-from django.core.exceptions import ValidationError
+from django.db import models, transaction, connections, router
+from django.db.models import signals
+from django.db.models.deletion import Collector
+from django.core.exceptions import ValidationError, FieldDoesNotExist, NON_FIELD_ERRORS
+from django.utils import timezone
 from django.db.utils import IntegrityError
 from django.db import OperationalError
-import datetime
+from asgiref.sync import sync_to_async, async_to_sync
+from contextvars import ContextVar
+import asyncio
 import argon2
-import uuid
 import jwt
 
 
 REGION = 'MODEL_STORAGE'
 
+
+class TooManyRowsAffected(Exception):
+    '''Raised to roll back bulk operations that exceed `Bulk.max_affected_rows`'''
+    def __init__(self, count):
+        super().__init__(f'{count} rows would have been affected')
+        self.count = count
+
+# Resolved hook chains, keyed by model, operation, and
+# whether `*_anything` hooks are included
+_hook_chains = {}
+
+# The operation whose hooks were applied by its async counterpart,
+# which the operation skips, rather than apply them twice
+_hooks_applied = ContextVar('instant_rest_hooks_applied', default=None)
+
+
+def call_hook(hook_fn, **input):
+    '''Call a hook, running it to completion if it's a coroutine function'''
+    if asyncio.iscoroutinefunction(hook_fn):
+        return async_to_sync(hook_fn)(**input)
+    return hook_fn(**input)
+
+
+async def acall_hook(hook_fn, **input):
+    '''Await a hook, calling it in a thread unless it's a coroutine function'''
+    if asyncio.iscoroutinefunction(hook_fn):
+        return await hook_fn(**input)
+    return await sync_to_async(hook_fn)(**input)
+
+
+class HookList(list):
+    '''
+    A list of hooks that counts changes made to any list of hooks,
+    so that resolved hook chains can tell when they're out of date.
+    '''
+    generation = 0
+
+    @staticmethod
+    def changed():
+        HookList.generation += 1
+
+    def _changing(method):
+        def wrapper(self, *args, **kwargs):
+            result = method(self, *args, **kwargs)
+            HookList.changed()
+            return result
+        return wrapper
+
+    append = _changing(list.append)
+    extend = _changing(list.extend)
+    insert = _changing(list.insert)
+    remove = _changing(list.remove)
+    pop = _changing(list.pop)
+    clear = _changing(list.clear)
+    sort = _changing(list.sort)
+    reverse = _changing(list.reverse)
+    __setitem__ = _changing(list.__setitem__)
+    __delitem__ = _changing(list.__delitem__)
+    __iadd__ = _changing(list.__iadd__)
+    __imul__ = _changing(list.__imul__)
+    del _changing
+
+
+def with_index(index, errors):
+    '''Mark errors as belonging to the object at `index` of a list'''
+    return [ { **error, 'index': index } for error in errors ]
+
+
+def supports_delete_returning(connection):
+    '''
+    Whether a database accepts `DELETE ... RETURNING <columns>`, which
+    PostgreSQL, SQLite 3.35+ and MariaDB 10.0.5+ do. Oracle only
+    returns columns `INTO` variables, and MySQL can't return them.
+    '''
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 35)
+    if connection.vendor == 'mysql':
+        return connection.mysql_is_mariadb and connection.mysql_version >= (10, 0, 5)
+    return False
+
+
 def default_get_many_args(kwargs = {}):
     input = kwargs
     input['filters'] = input.get('filters', {})
@@ -33,36 +125,7 @@ class BaseModel(models.Model):
 
     def to_dict(self):
         '''Convert model instances to dictionaries'''
-        result = {}
-        for field in self._meta.fields:
-
-            field_name = field.name
-
-            # Skipping hidden fields
-            if field.name in self.Serializer.hidden_fields:
-                continue
-
-            value = getattr(self, field.name)
-
-            # Handling UUID fields
-            if type(value) == uuid.UUID:
-                value = str(value)
-
-            # Handling datetime fields
-            if type(value) == datetime.datetime:
-                value = value.isoformat()
-
-            # Handling relational fields 
-            if hasattr(value, "id"):
-                value = value.id
-
-                if not field_name.endswith('_id'):
-                    field_name += '_id'
-
-            
-            result[field_name] = value
-
-        return result
+        return get_serializer(type(self))(self)
 
 
     @classmethod
@@ -86,50 +149,189 @@ class RestResource(BaseModel):
 
     class Meta:
         abstract = True
-        indexes = [ models.Index(fields=['created_at']) ]
+        indexes = [ models.Index(fields=['created_at', 'id']) ]
 
     class Pagination:
         default_page_size = 50
+
+        # Whether to spend an extra EXISTS query on `has_prev_page` when
+        # paginating forward (or `has_next_page` when paginating backward).
+        # When disabled, the flag is reported as None.
+        probe_opposite_page = True
+
+        # How the `total_count` pseudo-field is computed, by default.
+        # One of 'exact' (COUNT(*)), 'estimated' (query planner statistics,
+        # where the database has them) or 'cached' (an exact count that's
+        # remembered for `total_count_ttl` seconds per set of filters).
+        total_count_mode = 'exact'
+        total_count_ttl = 60
+
+        # How many rows are read from the database at a time
+        # when a list of objects is streamed to a client.
+        stream_chunk_size = 500
     
+    class Bulk:
+        # How many objects are written by each INSERT of a bulk operation
+        batch_size = 1000
+
+        # The most objects that `update_many` or `delete_many` may change,
+        # counting the rows that deletions cascade to. Operations that
+        # would change more are rolled back.
+        max_affected_rows = 1000
+
+    class Caching:
+        # Whether `get_one` payloads are cached, by id. Entries are
+        # forgotten whenever an instance is saved or deleted.
+        enabled = False
+
+        # Whether `get_many` pages are cached too, by their input.
+        # Every write starts a new generation of pages, leaving
+        # the old ones to expire, or to be evicted.
+        pages = False
+
+        # Either 'local', for an in-process cache that's bounded by
+        # `max_entries`, or the alias of a cache in Django's `CACHES`.
+        backend = 'local'
+        max_entries = 1024
+
+        # How many seconds entries are kept for
+        timeout = 60
+
+        # Whether identical `get_one` and `get_many` calls that are made
+        # at the same time, within a process, share a single execution.
+        # Calls that start after a write never share an earlier call's.
+        # This doesn't depend on `enabled`.
+        coalesce = False
+
+        # Whether `GET` responses carry `ETag` and `Last-Modified` headers,
+        # and answer requests whose `If-None-Match` or `If-Modified-Since`
+        # still match with a 304, skipping the query and serialization.
+        # Objects are validated by their `updated_at`. Lists are validated
+        # by an extra MAX(updated_at) and COUNT(*) query over the filtered
+        # rows, which scans them, so lists need `conditional_lists` too.
+        conditional = True
+        conditional_lists = False
+
+    class Deletion:
+        # Whether `delete_one` deletes with a single `DELETE ... RETURNING`
+        # statement, on databases that support it. Models that other
+        # models depend on (or that have delete signal receivers) are
+        # still deleted through Django's collector, unless `db_cascade`.
+        returning = False
+
+        # Whether the database itself cascades deletions to dependent rows,
+        # through foreign keys declared with ON DELETE CASCADE. Django
+        # doesn't declare these, so they must be added by a migration.
+        # Dependent rows are then deleted without their signals firing.
+        db_cascade = False
+
     class Hooks:
         before_anything = []
+        before_create_many = []
         before_create_one = []
+        before_delete_many = []
         before_delete_one = []
         before_get_many = []
         before_get_one = []
+        before_update_many = []
         before_update_one = []
+        before_upsert_many = []
 
         after_anything = []
+        after_create_many = []
         after_create_one = []
+        after_delete_many = []
         after_delete_one = []
         after_get_many = []
         after_get_one = []
+        after_update_many = []
         after_update_one = []
+        after_upsert_many = []
+
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        # Making every list of hooks report changes, including
+        # lists inherited from the classes `Hooks` extends
+        for hooks in cls.Hooks.__mro__:
+            for name, value in list(vars(hooks).items()):
+                if type(value) == list:
+                    setattr(hooks, name, HookList(value))
+
+        # Invalidating cached payloads from the start, since
+        # other processes may share the cache.
+        if getattr(cls, 'Caching', None) and (cls.Caching.enabled or cls.Caching.coalesce):
+            caching.connect(cls)
+
+
+    @classmethod
+    def hook_chain(cls, fn_name, anything = True):
+        '''
+        Return the pre-operation and post-operation hooks of an operation,
+        as a pair of tuples. Chains are resolved once, and again only when
+        `Hooks` is replaced, or one of its lists is changed. Hooks that
+        are assigned to an existing `Hooks` class as plain lists are only
+        seen after `HookList.changed()` is called.
+        '''
+        key = (cls, fn_name, anything)
+        chain = _hook_chains.get(key)
+        if chain and chain[0] == HookList.generation and chain[1] is cls.Hooks:
+            return chain[2]
+
+        hooks = cls.Hooks
+        before = getattr(hooks, f"before_{fn_name}", [])
+        after = getattr(hooks, f"after_{fn_name}", [])
+        if anything:
+            before = getattr(hooks, 'before_anything', []) + before
+            after = getattr(hooks, 'after_anything', []) + after
+
+        _hook_chains[key] = (HookList.generation, hooks, (tuple(before), tuple(after)))
+        return _hook_chains[key][2]
 
 
     @classmethod
     def with_hooks(cls, fn, fn_name):
+        before_hooks, after_hooks = cls.hook_chain(fn_name)
+
+        # Skipping hooks that an async operation already applied
+        if _hooks_applied.get() == fn_name:
+            _hooks_applied.set(None)
+            before_hooks, after_hooks = (), ()
+
+        # Skipping the wrapper entirely for models without hooks,
+        # unless operations are being measured.
+        if not before_hooks and not after_hooks:
+            if not instrumentation.enabled:
+                return fn
+
+            def measured(**input):
+                with measure(cls, fn_name):
+                    return fn(**input)
+
+            return measured
+
         def wrapper(**input):
             try:
                 output = None
 
-                # Applying pre-operation hooks
-                after_hooks = getattr(cls.Hooks, f"after_{fn_name}")
-                before_hooks = getattr(cls.Hooks, f"before_{fn_name}")
+                with measure(cls, fn_name):
+                    # Applying pre-operation hooks
+                    with phase('hooks'):
+                        for hook_fn in before_hooks:
+                            input, errors = call_hook(hook_fn, **input)
 
-                for hook_fn in cls.Hooks.before_anything + before_hooks:
-                    input, errors = hook_fn(**input)
+                            if errors:
+                                output = { "payload": None, "errors": errors }
+                                break
 
-                    if errors:
-                        output = { "payload": None, "errors": errors }
-                        break
+                    # Performing the actual data fetching
+                    output = output if output else fn(**input)
 
-                # Performing the actual data fetching
-                output = output if output else fn(**input)
-
-                # Applying post-operation hooks
-                for hook_fn in cls.Hooks.after_anything + after_hooks:
-                    output = hook_fn(**output)
+                    # Applying post-operation hooks
+                    with phase('hooks'):
+                        for hook_fn in after_hooks:
+                            output = call_hook(hook_fn, **output)
 
                 return output 
 
@@ -140,9 +342,114 @@ class RestResource(BaseModel):
         return wrapper
 
 
+    @classmethod
+    async def _perform_async(cls, fn_name, input):
+        '''
+        Perform an operation for its async counterpart. Hooks that are
+        coroutine functions are awaited, while other hooks are called
+        in a thread. The operation itself runs in a single thread hop,
+        however many queries it makes, and identical reads are coalesced
+        on the event loop if the model's `Caching` enables `coalesce`.
+        '''
+        before_hooks, after_hooks = cls.hook_chain(fn_name)
+
+        def perform(**input):
+            _hooks_applied.set(fn_name)
+            return getattr(cls, fn_name)(**input)
+
+        async def perform_async(**input):
+            return await sync_to_async(perform)(**input)
+
+        if fn_name in ['get_one', 'get_many']:
+            perform_async = caching.coalesced(cls, fn_name, perform_async)
+
+        try:
+            output = None
+
+            with measure(cls, fn_name):
+                # Applying pre-operation hooks
+                with phase('hooks'):
+                    for hook_fn in before_hooks:
+                        input, errors = await acall_hook(hook_fn, **input)
+
+                        if errors:
+                            output = { "payload": None, "errors": errors }
+                            break
+
+                # Performing the actual data fetching
+                output = output if output else await perform_async(**input)
+
+                # Applying post-operation hooks
+                with phase('hooks'):
+                    for hook_fn in after_hooks:
+                        output = await acall_hook(hook_fn, **output)
+
+            return output
+
+        except Exception as e:
+            error = FAILED_UNEXPECTEDLY('applying hooks', region = REGION, exception = e)
+            return { "payload": None, "errors": [error] }
+
+
+    @classmethod
+    def _can_delete_returning(cls, connection):
+        '''
+        Determine whether instances can be deleted by a single
+        `DELETE ... RETURNING` statement, without Django's collector.
+        '''
+        if not cls.Deletion.returning:
+            return False
+
+        if not supports_delete_returning(connection):
+            return False
+
+        if cls.Deletion.db_cascade:
+            has_listeners = any(s.has_listeners(cls) for s in [signals.pre_delete, signals.post_delete])
+            return not has_listeners and not cls._meta.parents
+
+        return Collector(using=connection.alias).can_fast_delete(cls)
+
+
+    @classmethod
+    def _delete_returning(cls, connection, id):
+        '''
+        Delete an instance with a single `DELETE ... RETURNING` statement,
+        returning its serialized fields, or None if it didn't exist.
+        '''
+        serializer = get_serializer(cls)
+        table = cls._meta.db_table
+        pk = cls._meta.pk
+        fields = [ cls._meta.get_field(attname) for attname in serializer.attnames ]
+        qn = connection.ops.quote_name
+
+        columns = ', '.join(qn(f.column) for f in fields)
+        sql = f'DELETE FROM {qn(table)} WHERE {qn(pk.column)} = %s RETURNING {columns}'
+        params = [ pk.get_db_prep_value(pk.to_python(id), connection) ]
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+
+        if row is None:
+            return None
+
+        # Converting database values the way a queryset would
+        values = []
+        for f, value in zip(fields, row):
+            column = f.get_col(table)
+            for converter in connection.ops.get_db_converters(column) + column.get_db_converters(connection):
+                value = converter(value, column, connection)
+            values.append(value)
+
+        return serializer.from_row(values)
+
+
     @classmethod
     def delete_one(cls, **input):
-        '''Tries to delete a an existing model instance'''
+        '''
+        Tries to delete a an existing model instance. See `Deletion` for
+        deleting with a single statement, where the model allows it.
+        '''
 
         def inner_fn(**input):
             id = input.get('id', None)
@@ -151,6 +458,14 @@ class RestResource(BaseModel):
                 # Removing non-field input
                 input.pop('auth_claims', None)
 
+                connection = connections[router.db_for_write(cls)]
+                if cls._can_delete_returning(connection):
+                    payload = cls._delete_returning(connection, id)
+                    if payload is None:
+                        raise cls.DoesNotExist()
+                    caching.invalidate(cls, [id])
+                    return { "payload" : payload, "errors": [] }
+
                 model_instance = cls.objects.get(id=id)
                 model_instance.delete()
                 payload = model_instance.to_dict()
@@ -168,26 +483,50 @@ class RestResource(BaseModel):
 
     @classmethod
     def update_one(cls, **input):
-        '''Attempts to update an existing model instance'''
+        '''
+        Attempts to update an existing model instance. Relations are
+        assigned by id, without fetching the related objects, and only
+        the fields that were given are validated and written.
+        '''
         
         def inner_fn(**input):
             try:
                 # Removing non-field input
                 input.pop('auth_claims', None)
 
-                model_instance = cls.objects.get(id=input.get('id', None))
-                for key in input:
-                    field = getattr(cls, key)
-
-                    if field.field.is_relation is True and input[key] != None:
-                        related_model = field.field.related_model
-                        input[key] = related_model.objects.get(id = input[key])
-
-                    setattr(model_instance, key, input[key])
+                id = input.pop('id', None)
+                model_instance = cls.objects.get(id=id)
 
-                # Validating and storing data
-                model_instance.full_clean()
-                model_instance.save()
+                changed_fields = []
+                for key in input:
+                    try:
+                        field = cls._meta.get_field(key)
+                    except FieldDoesNotExist:
+                        field = None
+
+                    # Reverse relations can't be written from this side
+                    if field is None or not field.concrete:
+                        raise AttributeError(f"type object '{cls.__name__}' has no attribute '{key}'")
+
+                    # Assigning relations through their `<name>_id` attribute,
+                    # unless a related object was given
+                    if isinstance(input[key], models.Model):
+                        setattr(model_instance, field.name, input[key])
+                    else:
+                        setattr(model_instance, field.attname, input[key])
+                    changed_fields.append(field.name)
+
+                # Keeping `auto_now` fields current, as a full save would
+                update_fields = changed_fields + [
+                    f.name for f in cls._meta.concrete_fields
+                    if getattr(f, 'auto_now', False) and f.name not in changed_fields
+                ]
+
+                # Validating and storing only the fields that changed
+                unchanged_fields = [ f.name for f in cls._meta.fields if f.name not in changed_fields ]
+                model_instance.full_clean(exclude=unchanged_fields)
+                model_instance.save(update_fields=update_fields)
+                caching.invalidate(cls, [id])
 
                 payload = model_instance.to_dict()
                 return { "payload": payload, "errors": [] }
@@ -203,9 +542,11 @@ class RestResource(BaseModel):
         
             # Handling attempts to edit non-existent objects
             except cls.DoesNotExist:
-                id = input.get('id', None)
                 return { "payload": None, "errors": [OBJECT_WITH_ID_DOES_NOT_EXIST(id)] }
 
+            except IntegrityError as e:
+                return { "payload": None, "errors": [DATABASE_INTEGRITY_VIOLATED] }
+
             except Exception as e:
                     error = FAILED_UNEXPECTEDLY('updating an object', region = REGION, exception = e)
                     return { "payload": None, "errors": [error] }
@@ -249,6 +590,506 @@ class RestResource(BaseModel):
         return cls.with_hooks(inner_fn, 'create_one')(**input)
 
 
+    @classmethod
+    def _build_many(cls, objects, auth_claims = None, upsert_fields = ()):
+        '''
+        Turn a list of objects into unsaved, validated model instances,
+        applying the `before_create_one` hooks to each. Related objects
+        are looked up with one query per relation, and uniqueness is
+        checked with one query per set of unique fields. Returns the
+        instances, along with a list of errors, each carrying the `index`
+        of its object. See `_unique_errors` for `upsert_fields`.
+        '''
+        errors = []
+
+        # Applying per-object pre-operation hooks
+        items = []
+        for index, item in enumerate(objects):
+            if type(item) != dict:
+                errors += with_index(index, [INVALID_OBJECT_RECEIVED])
+                continue
+
+            item = { **item, 'auth_claims': auth_claims }
+            for hook_fn in cls.hook_chain('create_one', anything = False)[0]:
+                item, item_errors = call_hook(hook_fn, **item)
+                if item_errors:
+                    errors += with_index(index, item_errors)
+                    break
+
+            item.pop('auth_claims', None)
+            items.append(item)
+
+        if errors:
+            return [], errors
+
+        # Looking up related objects, with one query per relation,
+        # once the ids of each have been converted, or found invalid.
+        relations = {}
+        invalid = set()
+        for field in cls._meta.concrete_fields:
+            if field.is_relation:
+                ids = set()
+                for index, item in enumerate(items):
+                    if item.get(field.name) is None:
+                        continue
+                    try:
+                        item[field.name] = field.target_field.to_python(item[field.name])
+                        ids.add(item[field.name])
+                    except ValidationError as e:
+                        errors += with_index(index, cls._unpack_validation_error(ValidationError({ field.name: e.messages })))
+                        invalid.add(index)
+
+                if ids:
+                    related_objects = field.related_model.objects.in_bulk(ids, field_name=field.target_field.name)
+                    relations[field.name] = { str(k): v for k, v in related_objects.items() }
+
+        # Validating every object, except for the relations it was
+        # given, and uniqueness constraints, which are checked in bulk.
+        instances = []
+        instance_indexes = []
+        for index, item in enumerate(items):
+            if index in invalid:
+                continue
+            try:
+                resolved = []
+                for key, related_objects in relations.items():
+                    if item.get(key) is None:
+                        continue
+                    if str(item[key]) not in related_objects:
+                        raise ValidationError({ key: [f'Object with ID "{item[key]}" does not exist'] })
+                    item[key] = related_objects[str(item[key])]
+                    resolved.append(key)
+
+                model_instance = cls(**item)
+                model_instance.full_clean(exclude=resolved, validate_unique=False)
+                instances.append(model_instance)
+                instance_indexes.append(index)
+
+            except ValidationError as e:
+                errors += with_index(index, cls._unpack_validation_error(e))
+
+            except TypeError as e:
+                errors += with_index(index, [{ "message": str(e) }])
+
+        errors += cls._unique_errors(instances, instance_indexes, upsert_fields)
+        errors.sort(key=lambda error: error['index'])
+        return instances, errors
+
+
+    @classmethod
+    def _unique_errors(cls, instances, indexes, upsert_fields = ()):
+        '''
+        Check unsaved instances against every set of unique fields,
+        with one query per set, and against each other. Returns errors
+        carrying the given `index` of each conflicting instance. With
+        `upsert_fields`, stored rows that share those fields with an
+        instance are the rows it updates, so they don't conflict with it.
+        '''
+        errors = []
+        upsert_attnames = [ cls._meta.get_field(name).attname for name in upsert_fields ]
+
+        for field_names in cls._unique_field_sets():
+            if field_names == set(upsert_fields):
+                continue
+
+            fields = [ f for f in cls._meta.concrete_fields if f.name in field_names ]
+            names = tuple(f.name for f in fields)
+            attnames = [ f.attname for f in fields ]
+
+            def unique_error(index, model_instance):
+                error = model_instance.unique_error_message(cls, names)
+                key = names[0] if len(names) == 1 else NON_FIELD_ERRORS
+                return with_index(index, cls._unpack_validation_error(ValidationError({ key: [error] })))
+
+            # Finding objects that share values, leaving unset values
+            # for the database to fill in, as Django does.
+            keys = {}
+            for index, model_instance in zip(indexes, instances):
+                key = tuple(getattr(model_instance, attname) for attname in attnames)
+                if None in key:
+                    continue
+                if key in keys:
+                    errors += with_index(index, [DUPLICATE_UNIQUE_FIELDS(list(names), keys[key][0])])
+                else:
+                    keys[key] = (index, model_instance)
+
+            # Finding stored rows that share values, narrowing
+            # them by the first field, and matching the rest here.
+            key_list = list(keys)
+            for start in range(0, len(key_list), cls.Bulk.batch_size):
+                first_values = { key[0] for key in key_list[start:start + cls.Bulk.batch_size] }
+                query = cls.objects.filter(**{ f'{attnames[0]}__in': first_values })
+                for row in query.values_list(*attnames, *upsert_attnames):
+                    match = keys.get(row[:len(attnames)])
+                    if match is None:
+                        continue
+
+                    index, model_instance = match
+                    upsert_key = tuple(getattr(model_instance, attname) for attname in upsert_attnames)
+                    if upsert_attnames and row[len(attnames):] == upsert_key:
+                        continue
+
+                    errors += unique_error(index, model_instance)
+
+        return errors
+
+
+    @classmethod
+    def _finish_many(cls, instances):
+        '''Serialize stored instances, applying the `after_create_one` hooks to each'''
+        payload = []
+        errors = []
+        add_rows(len(instances))
+        for index, model_instance in enumerate(instances):
+            output = { "payload": model_instance.to_dict(), "errors": [] }
+            for hook_fn in cls.hook_chain('create_one', anything = False)[1]:
+                output = call_hook(hook_fn, **output)
+
+            payload.append(output['payload'])
+            errors += with_index(index, output['errors'])
+
+        return { "payload": payload, "errors": errors }
+
+
+    @classmethod
+    def create_many(cls, **input):
+        '''
+        Tries to store a list of new model instances, given as `objects`.
+        Related objects are looked up with one query per relation, and every
+        instance is written inside a single transaction, using `bulk_create`
+        unless the model overrides `save()`. If any object is invalid, none
+        are stored, and each error carries the `index` of its object.
+
+        The `create_many` hooks run once for the whole list, and the
+        `create_one` hooks (except `*_anything`) run once per object.
+        '''
+
+        def inner_fn(**input):
+            try:
+                auth_claims = input.pop('auth_claims', None)
+                instances, errors = cls._build_many(input.get('objects', []), auth_claims)
+                if errors:
+                    return { "payload": None, "errors": errors }
+
+                # Storing every object, or none of them
+                with transaction.atomic():
+                    if cls.save is models.Model.save:
+                        cls.objects.bulk_create(instances, batch_size=cls.Bulk.batch_size)
+                    else:
+                        for model_instance in instances:
+                            model_instance.save()
+
+                    # Bulk writes don't send signals, so cached
+                    # pages are forgotten here instead.
+                    caching.invalidate(cls)
+
+                return cls._finish_many(instances)
+
+            except IntegrityError as e:
+                return { "payload": None, "errors": [DATABASE_INTEGRITY_VIOLATED] }
+
+            except Exception as e:
+                error = FAILED_UNEXPECTEDLY('storing new objects', region = REGION, exception = e)
+                return { "payload": None, "errors": [error] }
+
+        return cls.with_hooks(inner_fn, 'create_many')(**input)
+
+
+    @classmethod
+    def _unique_field_sets(cls):
+        '''List every set of field names that the database keeps unique'''
+        field_sets = [ { f.name } for f in cls._meta.concrete_fields if f.unique ]
+        field_sets += [ set(fields) for fields in cls._meta.unique_together ]
+        field_sets += [ set(c.fields) for c in cls._meta.total_unique_constraints ]
+        return field_sets
+
+
+    @classmethod
+    def _stored_rows(cls, fields, keys):
+        '''
+        Look up the stored rows whose `fields` match one of the given keys,
+        returning the id and creation-time values of each, by key. Rows are
+        narrowed by the first field in SQL, and by the whole key in Python.
+        '''
+        generated = [ f.attname for f in cls._meta.concrete_fields if getattr(f, 'auto_now_add', False) ]
+        attnames = [ f.attname for f in fields ]
+        keys = list(keys)
+        rows = {}
+
+        for start in range(0, len(keys), cls.Bulk.batch_size):
+            first_values = { key[0] for key in keys[start:start + cls.Bulk.batch_size] }
+            query = cls.objects.filter(**{ f'{attnames[0]}__in': first_values })
+            for row in query.values_list(*attnames, 'pk', *generated):
+                rows[row[:len(attnames)]] = dict(zip(['pk', *generated], row[len(attnames):]))
+
+        return rows
+
+
+    @classmethod
+    def upsert_many(cls, **input):
+        '''
+        Tries to store a list of objects, given as `objects`, updating the
+        stored instances that share their `unique_fields` instead of creating
+        new ones. Every field apart from `unique_fields` is overwritten.
+        Objects are validated like they are by `create_many`, and the
+        `create_one` hooks run once per object.
+
+        Where the database supports it, objects are written by batched
+        `INSERT ... ON CONFLICT DO UPDATE` statements. Otherwise the stored
+        instances are looked up with one query, and then written with
+        `bulk_update` and `bulk_create` inside a single transaction.
+        '''
+
+        def inner_fn(**input):
+            try:
+                auth_claims = input.pop('auth_claims', None)
+                unique_fields = list(input.get('unique_fields', []))
+
+                # Conflicts can only be detected on unique columns
+                if set(unique_fields) not in cls._unique_field_sets():
+                    return { "payload": None, "errors": [INVALID_UNIQUE_FIELDS(unique_fields)] }
+
+                instances, errors = cls._build_many(input.get('objects', []), auth_claims, unique_fields)
+                if errors:
+                    return { "payload": None, "errors": errors }
+
+                # Rejecting objects that share a key, since one
+                # statement can't write the same row twice.
+                fields = [ cls._meta.get_field(name) for name in unique_fields ]
+                indexes = {}
+                for index, model_instance in enumerate(instances):
+                    key = tuple(getattr(model_instance, f.attname) for f in fields)
+                    if key in indexes:
+                        errors += with_index(index, [DUPLICATE_UNIQUE_FIELDS(unique_fields, indexes[key])])
+                    indexes.setdefault(key, index)
+
+                if errors:
+                    return { "payload": None, "errors": errors }
+
+                update_fields = [
+                    f.name for f in cls._meta.concrete_fields
+                    if not f.primary_key and f.name not in unique_fields and not getattr(f, 'auto_now_add', False)
+                ]
+
+                connection = connections[router.db_for_write(cls)]
+                on_conflict = getattr(connection.features, 'supports_update_conflicts_with_target', False)
+
+                with transaction.atomic():
+                    if on_conflict and cls.save is models.Model.save:
+                        cls.objects.bulk_create(
+                            instances,
+                            batch_size=cls.Bulk.batch_size,
+                            update_conflicts=True,
+                            unique_fields=unique_fields,
+                            update_fields=update_fields,
+                        )
+
+                        # Reading back the ids of the rows that were written,
+                        # and the creation dates of the ones that were updated.
+                        stored = cls._stored_rows(fields, indexes)
+                        for key, index in indexes.items():
+                            for attname, value in stored[key].items():
+                                setattr(instances[index], attname, value)
+
+                    else:
+                        stored = cls._stored_rows(fields, indexes)
+                        now = timezone.now()
+                        new_instances = []
+                        stored_instances = []
+
+                        for key, index in indexes.items():
+                            model_instance = instances[index]
+                            if key not in stored:
+                                new_instances.append(model_instance)
+                                continue
+
+                            # Matching stored rows, and keeping `auto_now`
+                            # fields current, since `bulk_update` doesn't.
+                            for attname, value in stored[key].items():
+                                setattr(model_instance, attname, value)
+                            for field in cls._meta.concrete_fields:
+                                if getattr(field, 'auto_now', False):
+                                    setattr(model_instance, field.attname, now)
+
+                            model_instance._state.adding = False
+                            stored_instances.append(model_instance)
+
+                        if cls.save is models.Model.save:
+                            cls.objects.bulk_update(stored_instances, update_fields, batch_size=cls.Bulk.batch_size)
+                            cls.objects.bulk_create(new_instances, batch_size=cls.Bulk.batch_size)
+                        else:
+                            for model_instance in instances:
+                                model_instance.save()
+
+                    # Bulk writes don't send signals, so cached
+                    # payloads are forgotten here instead.
+                    caching.invalidate(cls, [ model_instance.pk for model_instance in instances ])
+
+                return cls._finish_many(instances)
+
+            except IntegrityError as e:
+                return { "payload": None, "errors": [DATABASE_INTEGRITY_VIOLATED] }
+
+            except Exception as e:
+                error = FAILED_UNEXPECTEDLY('storing a list of objects', region = REGION, exception = e)
+                return { "payload": None, "errors": [error] }
+
+        return cls.with_hooks(inner_fn, 'upsert_many')(**input)
+
+
+    @classmethod
+    def _filter_many(cls, input):
+        '''
+        Return the queryset matched by the `filters` of a bulk operation,
+        or None if there are no filters, so that whole tables aren't
+        changed by accident.
+        '''
+        filters = input.get('filters', {})
+        return cls.objects.filter(**filters) if len(filters) else None
+
+
+    @classmethod
+    def update_many(cls, **input):
+        '''
+        Tries to apply the same `fields` to every model instance matching
+        `filters`, using a single UPDATE statement. With `dry_run`, only
+        the number of matching instances is returned. Updates that would
+        change more than `Bulk.max_affected_rows` instances are rolled back.
+        '''
+
+        def inner_fn(**input):
+            try:
+                # Removing non-field input
+                input.pop('auth_claims', None)
+
+                query = cls._filter_many(input)
+                if query is None:
+                    return { "payload": None, "errors": [BULK_OPERATION_REQUIRES_FILTERS] }
+
+                if input.get('dry_run', False):
+                    return { "payload": { "count": query.count(), "dry_run": True }, "errors": [] }
+
+                fields = input.get('fields') or {}
+                if not fields:
+                    return { "payload": None, "errors": [BULK_UPDATE_REQUIRES_FIELDS] }
+
+                # Validating each field on its own, since there's no instance
+                changes = {}
+                for key, value in fields.items():
+                    try:
+                        field = cls._meta.get_field(key)
+                        if not field.concrete or field.primary_key or not field.editable:
+                            raise ValidationError(f'Field "{key}" cannot be updated')
+
+                        changes[field.attname] = field.clean(value, None)
+
+                    except FieldDoesNotExist:
+                        raise ValidationError({ key: [f'Field "{key}" does not exist'] })
+
+                    except ValidationError as e:
+                        raise ValidationError({ key: e.messages })
+
+                # Keeping `auto_now` fields current, as `save()` would
+                for field in cls._meta.concrete_fields:
+                    if getattr(field, 'auto_now', False):
+                        changes[field.attname] = timezone.now()
+
+                with transaction.atomic():
+                    # Noting which payloads to forget, since the update may
+                    # change which rows match. Reading no more ids than
+                    # may be updated, since more would be rolled back.
+                    cached = caching.cache_for(cls) is not None
+                    if cached:
+                        ids = list(query.values_list('pk', flat=True)[:cls.Bulk.max_affected_rows + 1])
+
+                    count = query.update(**changes)
+                    if count > cls.Bulk.max_affected_rows:
+                        raise TooManyRowsAffected(count)
+
+                    # Updates don't send signals, so cached
+                    # payloads are forgotten here instead.
+                    if cached:
+                        caching.invalidate(cls, ids)
+
+                return { "payload": { "count": count, "dry_run": False }, "errors": [] }
+
+            except ValidationError as e:
+                errors = cls._unpack_validation_error(e)
+                return { "payload": None, "errors": errors }
+
+            except TooManyRowsAffected as e:
+                return { "payload": None, "errors": [TOO_MANY_OBJECTS_AFFECTED(e.count, cls.Bulk.max_affected_rows)] }
+
+            except IntegrityError:
+                return { "payload": None, "errors": [DATABASE_INTEGRITY_VIOLATED] }
+
+            except Exception as e:
+                error = FAILED_UNEXPECTEDLY('updating a list of objects', region = REGION, exception = e)
+                return { "payload": None, "errors": [error] }
+
+        return cls.with_hooks(inner_fn, 'update_many')(**input)
+
+
+    @classmethod
+    def _deletion_counts(cls, query):
+        '''
+        Count the rows that deleting a query would delete, by model label,
+        including the rows that deletions cascade to, without deleting them.
+        '''
+        collector = Collector(using=query.db)
+        collector.collect(query)
+
+        counts = {}
+        for model, instances in collector.data.items():
+            counts[model._meta.label] = counts.get(model._meta.label, 0) + len(instances)
+        for fast_delete in collector.fast_deletes:
+            label = fast_delete.model._meta.label
+            counts[label] = counts.get(label, 0) + fast_delete.count()
+        return { label: count for label, count in counts.items() if count }
+
+
+    @classmethod
+    def delete_many(cls, **input):
+        '''
+        Tries to delete every model instance matching `filters`, using a
+        single `QuerySet.delete()`. The payload counts every deleted row,
+        including the rows of other models that deletions cascade to,
+        along with the `counts` of each model. With `dry_run`, rows are
+        only counted. Deletions that would remove more than
+        `Bulk.max_affected_rows` rows are rolled back.
+        '''
+
+        def inner_fn(**input):
+            try:
+                # Removing non-field input
+                input.pop('auth_claims', None)
+
+                query = cls._filter_many(input)
+                if query is None:
+                    return { "payload": None, "errors": [BULK_OPERATION_REQUIRES_FILTERS] }
+
+                if input.get('dry_run', False):
+                    counts = cls._deletion_counts(query)
+                    return { "payload": { "count": sum(counts.values()), "counts": counts, "dry_run": True }, "errors": [] }
+
+                with transaction.atomic():
+                    count, counts = query.delete()
+                    if count > cls.Bulk.max_affected_rows:
+                        raise TooManyRowsAffected(count)
+
+                counts = { label: count for label, count in counts.items() if count }
+                return { "payload": { "count": count, "counts": counts, "dry_run": False }, "errors": [] }
+
+            except TooManyRowsAffected as e:
+                return { "payload": None, "errors": [TOO_MANY_OBJECTS_AFFECTED(e.count, cls.Bulk.max_affected_rows)] }
+
+            except Exception as e:
+                error = FAILED_UNEXPECTEDLY('deleting a list of objects', region = REGION, exception = e)
+                return { "payload": None, "errors": [error] }
+
+        return cls.with_hooks(inner_fn, 'delete_many')(**input)
+
+
     @classmethod
     def get_one(cls, **input):
         """Retrieve a single model instance as a dictionary"""
@@ -259,8 +1100,25 @@ class RestResource(BaseModel):
                 input.pop('auth_claims', None)
 
                 id = input.get('id', None)
+
+                # Reading through the cache, if there is one
+                cache = caching.cache_for(cls)
+                if cache is not None:
+                    payload = cache.get(caching.instance_key(cls, id))
+                    count_cache_lookup(payload is not None)
+                    if payload is not None:
+                        return { 'payload': dict(payload), 'errors': [] }
+
                 model_instance = cls.objects.get(id=id)
-                return { 'payload': model_instance.to_dict(), 'errors': [] }
+                add_rows(1)
+
+                with phase('serialization'):
+                    payload = model_instance.to_dict()
+
+                if cache is not None:
+                    cache.set(caching.instance_key(cls, id), dict(payload), cls.Caching.timeout)
+
+                return { 'payload': payload, 'errors': [] }
 
             except cls.DoesNotExist:
                 return { "payload": None, "errors": [OBJECT_WITH_ID_DOES_NOT_EXIST(id)] }
@@ -269,7 +1127,107 @@ class RestResource(BaseModel):
                 error = FAILED_UNEXPECTEDLY('retrieving an object', region = REGION, exception = e)
                 return { "payload": None, "errors": [error] }
         
-        return cls.with_hooks(inner_fn, 'get_one')(**input)
+        return cls.with_hooks(caching.coalesced(cls, 'get_one', inner_fn), 'get_one')(**input)
+
+
+    @classmethod
+    def _hidden_ordering(cls, order_by):
+        '''
+        Return the first `order_by` term that orders by a hidden field, or
+        by a lookup through one, since results ordered by a hidden field
+        would reveal its values to API consumers. Returns None otherwise.
+        '''
+        for term in order_by:
+            if term.lstrip('-').split('__')[0] in cls.Serializer.hidden_fields:
+                return term
+        return None
+
+
+    @classmethod
+    def _prepare_many(cls, input):
+        '''
+        Interpret `get_many` input, returning the queryset it describes,
+        its sort keys, and the fields that were selected only for pagination.
+        '''
+        # Building a queryset using filtering and ordering params
+        filters = input.get('filters', {})
+        order_by = input.get('order_by', [])
+        query = cls.objects.filter(**filters) if len(filters) else cls.objects.all()
+        query = query.order_by(*order_by) if len(order_by) else query
+
+        # Refusing to order by hidden fields, because cursors
+        # would otherwise carry their values to API consumers.
+        try:
+            keys = sort_keys(query)
+        except ValueError:
+            return { "errors": [INVALID_ORDER_BY_PARAMETER(','.join(order_by))] }
+
+        cursor_fields = [ name for name, _, _ in keys ]
+        hidden = cls._hidden_ordering(cursor_fields)
+        if hidden is not None:
+            return { "errors": [INVALID_ORDER_BY_PARAMETER(hidden)] }
+
+        # Modifying the queryset to retrieve only desired fields,
+        # and those that are necessary for pagination.
+        fields = input.get('fields', [])
+        selected_fields = fields if len(fields) else [ f.attname for f in cls._meta.concrete_fields ]
+        extra_fields = [ f for f in cursor_fields if f not in selected_fields ]
+        query = query.values(*selected_fields, *extra_fields)
+
+        # Counting every matching object, only if asked to
+        pseudo_fields = input.get('pseudo_fields', [])
+        counting = {}
+        if 'total_count' in pseudo_fields:
+            mode = input.get('total_count_mode') or cls.Pagination.total_count_mode
+            if mode not in COUNT_MODES:
+                return { "errors": [INVALID_TOTAL_COUNT_MODE(mode)] }
+
+            count, mode = total_count(query, mode, cls.Pagination.total_count_ttl)
+            counting = { 'total_count': count, 'total_count_mode': mode }
+
+        # Applying the default page size
+        first = input.get('first')
+        last = input.get('last')
+        if not first and not last:
+            first = cls.Pagination.default_page_size
+
+        probe_opposite_page = input.get('probe_opposite_page')
+        if probe_opposite_page is None:
+            probe_opposite_page = cls.Pagination.probe_opposite_page
+
+        return {
+            "query": query,
+            "extra_fields": extra_fields,
+            "pseudo_fields": pseudo_fields,
+            "counting": counting,
+            "first": first,
+            "last": last,
+            "after": input.get('after'),
+            "before": input.get('before'),
+            "probe_opposite_page": probe_opposite_page,
+            "errors": [],
+        }
+
+
+    @classmethod
+    def _finish_node(cls, node, keys, prepared):
+        '''Prepare a dictionary returned by pagination to be sent to a client'''
+
+        # Removing hidden fields, because pagination.
+        # Normally, this would happen in `cls.to_dict()`,
+        # but pagination returns objects already as dicts.
+        for field_name in cls.Serializer.hidden_fields:
+            node.pop(field_name, None)
+
+        # Adding pseudo-fields
+        if 'cursor' in prepared['pseudo_fields']:
+            node['cursor'] = encode_cursor(node, keys)
+
+        # Removing unwanted cursor ingredient fields
+        for field_name in prepared['extra_fields']:
+            node.pop(field_name, None)
+
+        return node
 
 
     @classmethod
@@ -281,74 +1239,67 @@ class RestResource(BaseModel):
                 # Removing non-field input
                 input.pop('auth_claims', None)
 
-                # Building a queryset using filtering and ordering params
-                filters = input.get('filters', {})
-                order_by = input.get('order_by', [])
-                query = cls.objects.filter(**filters) if len(filters) else cls.objects.all()
-                query = query.order_by(*order_by) if len(order_by) else query
-
-                # Modifying the queryset to retrieve only desired fields,
-                # and those that are necessary for pagination.
-                fields = input.get('fields', [])
-                cursor_fields = ['id','created_at']
-                query = query.values(*fields, *cursor_fields) if len(fields) else query.values()
-
-                # Destructuring pagination params
-                first = input.get('first')
-                last = input.get('last')
-                before = input.get('before')
-                after = input.get('after')
+                # Reading through the cache, if pages are cached
+                cache = caching.cache_for(cls)
+                page_key = None
+                if cache is not None and cls.Caching.pages:
+                    page_key = caching.page_key(cls, cache, input)
+                    payload = cache.get(page_key)
+                    count_cache_lookup(payload is not None)
+                    if payload is not None:
+                        return { 'payload': caching.copy_page(payload), 'errors': [] }
+
+                prepared = cls._prepare_many(input)
+                if prepared['errors']:
+                    return { "payload": None, "errors": prepared['errors'] }
 
                 # Applying pagination
-                if not first and not last:
-                    first = cls.Pagination.default_page_size
+                with phase('pagination'):
+                    pagination = paginate(
+                        prepared['query'],
+                        prepared['first'],
+                        prepared['last'],
+                        prepared['after'],
+                        prepared['before'],
+                        prepared['probe_opposite_page'],
+                    )
 
-                pagination = paginate(query, first, last, after, before)
                 if pagination['error']:
                     return { "payload": None, "errors": [pagination['error']] }
 
                 # Getting cursor information
-                nodes = list(pagination['queryset'])
-
-                first_cursor = None if not len(nodes) else encode_cursor(nodes[0])
-                last_cursor = None if not len(nodes) else encode_cursor(nodes[-1])
-
-                # Removing hidden fields, because pagination.
-                # Normally, this would happen in `cls.to_dict()`,
-                # but pagination returns objects already as dicts.
-                for node in nodes:
-                    for field_name in cls.Serializer.hidden_fields:
-                        node.pop(field_name)
-
-                # Adding pseudo-fields
-                if 'cursor' in input.get('pseudo_fields', []):
-                    for node in nodes:
-                        node['cursor'] = encode_cursor(node)
-
-                # Removing unwanted cursor ingredient fields
-                if len(fields) and not 'id' in fields:
-                    for node in nodes:
-                        node.pop('id', None)
-
-                if len(fields) and not 'created_at' in fields:
-                    for node in nodes:
-                        node.pop('created_at', None)
-
-                return {
-                    'payload': {
-                        'first_cursor': first_cursor,
-                        'last_cursor': last_cursor,
-                        'has_next_page': pagination['has_next_page'],
-                        'has_prev_page': pagination['has_prev_page'],
-                        'nodes': nodes,
-                    },
-                    'errors': [],
+                with phase('serialization'):
+                    nodes = list(pagination['queryset'])
+                    add_rows(len(nodes))
+
+                keys = pagination['keys']
+                with phase('pagination'):
+                    first_cursor = None if not len(nodes) else encode_cursor(nodes[0], keys)
+                    last_cursor = None if not len(nodes) else encode_cursor(nodes[-1], keys)
+
+                with phase('serialization'):
+                    nodes = [ cls._finish_node(node, keys, prepared) for node in nodes ]
+
+                payload = {
+                    'first_cursor': first_cursor,
+                    'last_cursor': last_cursor,
+                    'has_next_page': pagination['has_next_page'],
+                    'has_prev_page': pagination['has_prev_page'],
+                    **prepared['counting'],
+                    'nodes': nodes,
                 }
+
+                if page_key is not None:
+                    cache.set(page_key, caching.copy_page(payload), cls.Caching.timeout)
+
+                return { 'payload': payload, 'errors': [] }
         
             except OperationalError as e:
                 return { 'payload': None, "errors": [DATABASE_INTEGRITY_VIOLATED] }
 
             except Exception as e:
+                before = input.get('before')
+                after = input.get('after')
                 if 'base64' in str(e):
                     if before:
                         return { 'payload': None, "errors": [INVALID_BEFORE_PARAMETER] }
@@ -358,9 +1309,213 @@ class RestResource(BaseModel):
                 error = FAILED_UNEXPECTEDLY('retrieving a list of objects', region = REGION, exception = e)
                 return { "payload": None, "errors": [error] }
 
+        return cls.with_hooks(caching.coalesced(cls, 'get_many', inner_fn), 'get_many')(**input)
+
+
+    @classmethod
+    def stream_many(cls, **input):
+        """
+        Retrieve a paginated list of model instance dictionaries, whose
+        `nodes` are produced lazily, reading rows from the database in
+        chunks of `Pagination.stream_chunk_size`. The page's cursors and
+        `has_next_page` are only filled in once every node has been consumed,
+        and errors that happen while streaming are appended to `errors`.
+        """
+
+        # Post-operation hooks expect to see every node at once
+        if cls.hook_chain('get_many')[1]:
+            return cls.get_many(**input)
+
+        def inner_fn(**input):
+            try:
+                # Removing non-field input
+                input.pop('auth_claims', None)
+
+                prepared = cls._prepare_many(input)
+                if prepared['errors']:
+                    return { "payload": None, "errors": prepared['errors'] }
+
+                # Applying pagination, without fetching forward pages yet
+                pagination = paginate(
+                    prepared['query'],
+                    prepared['first'],
+                    prepared['last'],
+                    prepared['after'],
+                    prepared['before'],
+                    prepared['probe_opposite_page'],
+                    lazy=True,
+                )
+
+                if pagination['error']:
+                    return { "payload": None, "errors": [pagination['error']] }
+
+                keys = pagination['keys']
+                quantity = prepared['first'] or prepared['last']
+                payload = {
+                    'first_cursor': None,
+                    'last_cursor': None,
+                    # Forward pages find out once their extra row is read
+                    'has_next_page': False if prepared['first'] else pagination['has_next_page'],
+                    'has_prev_page': pagination['has_prev_page'],
+                    **prepared['counting'],
+                }
+                output = { 'payload': payload, 'errors': [] }
+
+                def generate_nodes():
+                    rows = pagination['queryset']
+                    if not isinstance(rows, list):
+                        rows = rows.iterator(chunk_size=cls.Pagination.stream_chunk_size)
+
+                    try:
+                        count = 0
+                        for node in rows:
+                            # Fetching one extra row reveals whether there's a next page
+                            if count == quantity:
+                                payload['has_next_page'] = True
+                                break
+
+                            cursor = encode_cursor(node, keys)
+                            payload['first_cursor'] = payload['first_cursor'] or cursor
+                            payload['last_cursor'] = cursor
+                            count += 1
+                            add_rows(1)
+                            yield cls._finish_node(node, keys, prepared)
+
+                    except Exception as e:
+                        error = FAILED_UNEXPECTEDLY('streaming a list of objects', region = REGION, exception = e)
+                        output['errors'].append(error)
+
+                    finally:
+                        getattr(rows, 'close', lambda: None)()
+
+                payload['nodes'] = generate_nodes()
+                return output
+
+            except OperationalError as e:
+                return { 'payload': None, "errors": [DATABASE_INTEGRITY_VIOLATED] }
+
+            except Exception as e:
+                error = FAILED_UNEXPECTEDLY('retrieving a list of objects', region = REGION, exception = e)
+                return { "payload": None, "errors": [error] }
+
         return cls.with_hooks(inner_fn, 'get_many')(**input)
 
 
+    @classmethod
+    def export_many(cls, **input):
+        """
+        Retrieve every model instance matching the given filters, as a
+        generator of dictionaries. Rows are read through a server-side
+        cursor where the database supports one, `Pagination.stream_chunk_size`
+        rows at a time, so memory use doesn't grow with the table.
+
+        Hooks run as they do for `get_many`, except that post-operation
+        hooks are applied to each chunk of nodes, as though it were a page.
+        With `camel`, nodes are produced with camelCased keys.
+        """
+        try:
+            camel = input.pop('camel', False)
+
+            # Applying pre-operation hooks
+            before_hooks, after_hooks = cls.hook_chain('get_many')
+            for hook_fn in before_hooks:
+                input, errors = call_hook(hook_fn, **input)
+                if errors:
+                    return { "payload": None, "errors": errors }
+
+            # Removing non-field input
+            input.pop('auth_claims', None)
+
+            # Building a queryset using filtering and ordering params,
+            # refusing to order by hidden fields, as `get_many` does
+            filters = input.get('filters', {})
+            order_by = input.get('order_by', [])
+            hidden = cls._hidden_ordering(order_by)
+            if hidden is not None:
+                return { "payload": None, "errors": [INVALID_ORDER_BY_PARAMETER(hidden)] }
+
+            query = cls.objects.filter(**filters) if len(filters) else cls.objects.all()
+            query = query.order_by(*order_by) if len(order_by) else query
+
+            # Reading only the fields that the serializer exposes.
+            # Hooks expect snake_cased keys, so nodes are only
+            # serialized with camelCased keys if there are none.
+            serializer = get_serializer(cls, camel=camel and not after_hooks)
+            rows = query.values_list(*serializer.attnames).iterator(chunk_size=cls.Pagination.stream_chunk_size)
+            output = { "payload": {}, "errors": [] }
+
+            def generate_nodes():
+                try:
+                    chunk = []
+                    for row in rows:
+                        chunk.append(serializer.from_row(row))
+                        if len(chunk) == cls.Pagination.stream_chunk_size or not after_hooks:
+                            yield from apply_after_hooks(chunk)
+                            chunk = []
+
+                    yield from apply_after_hooks(chunk)
+
+                except Exception as e:
+                    error = FAILED_UNEXPECTEDLY('exporting a list of objects', region = REGION, exception = e)
+                    output['errors'].append(error)
+
+            def apply_after_hooks(nodes):
+                page = { "payload": { "nodes": nodes }, "errors": [] }
+                for hook_fn in after_hooks:
+                    page = call_hook(hook_fn, **page)
+
+                add_rows(len(nodes))
+                output['errors'] += page['errors']
+                nodes = page['payload']['nodes'] if page['payload'] else []
+                return [ camel_keys(node) for node in nodes ] if camel and after_hooks else nodes
+
+            output['payload']['nodes'] = generate_nodes()
+            return output
+
+        except Exception as e:
+            error = FAILED_UNEXPECTEDLY('exporting a list of objects', region = REGION, exception = e)
+            return { "payload": None, "errors": [error] }
+
+
+    # Async counterparts of each operation, for async views.
+    # They take the same input, and return the same output.
+
+    @classmethod
+    async def aget_one(cls, **input):
+        return await cls._perform_async('get_one', input)
+
+    @classmethod
+    async def aget_many(cls, **input):
+        return await cls._perform_async('get_many', input)
+
+    @classmethod
+    async def acreate_one(cls, **input):
+        return await cls._perform_async('create_one', input)
+
+    @classmethod
+    async def acreate_many(cls, **input):
+        return await cls._perform_async('create_many', input)
+
+    @classmethod
+    async def aupsert_many(cls, **input):
+        return await cls._perform_async('upsert_many', input)
+
+    @classmethod
+    async def aupdate_one(cls, **input):
+        return await cls._perform_async('update_one', input)
+
+    @classmethod
+    async def aupdate_many(cls, **input):
+        return await cls._perform_async('update_many', input)
+
+    @classmethod
+    async def adelete_one(cls, **input):
+        return await cls._perform_async('delete_one', input)
+
+    @classmethod
+    async def adelete_many(cls, **input):
+        return await cls._perform_async('delete_many', input)
+
             
 
 class RestClient(BaseModel):
@@ -1,38 +1,320 @@
-from base64 import b64decode, b64encode
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from binascii import Error as Base64Error
-from copy import copy
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from uuid import UUID
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from django.db.models.expressions import OrderBy
+from django.utils.crypto import salted_hmac
 from .errors import *
+import struct
+import hmac
 
-def encode_cursor(obj):
+# Every ordering is followed by these fields, in this order, so that rows
+# sharing the same sort values still have a deterministic position.
+CURSOR_FIELDS = ['created_at', 'id']
+DEFAULT_KEYS = [ (name, False, False) for name in CURSOR_FIELDS ]
+
+
+def is_nullable(model, field_name):
+    '''
+    Determine whether a field, or any relation leading to it, allows nulls.
+    '''
+    try:
+        for part in field_name.split('__'):
+            field = model._meta.get_field(part)
+            if field.null:
+                return True
+            model = field.related_model
+        return False
+    except (FieldDoesNotExist, AttributeError):
+        return False
+
+
+def sort_keys(queryset):
+    '''
+    Given a queryset, return the `(field_name, descending, nullable)` tuples
+    that its pages are ordered by: the queryset's own ordering, followed by
+    whichever of the cursor fields it doesn't already include.
+    '''
+    ordering = []
+    for term in queryset.query.order_by:
+        if isinstance(term, OrderBy) and isinstance(term.expression, F):
+            name, descending = term.expression.name, term.descending
+        elif isinstance(term, str) and term != '?':
+            name, descending = term.lstrip('-'), term.startswith('-')
+        else:
+            raise ValueError(f'Unable to paginate a queryset ordered by {term}')
+
+        name = 'id' if name == 'pk' else name
+        if name not in [ n for n, _ in ordering ]:
+            ordering.append((name, descending))
+
+    for name in CURSOR_FIELDS:
+        if name not in [ n for n, _ in ordering ]:
+            ordering.append((name, False))
+
+    return [ (name, descending, is_nullable(queryset.model, name)) for name, descending in ordering ]
+
+
+def order_for_keyset(queryset, keys):
+    '''
+    Apply the given sort keys to a queryset. Nullable keys sort their nulls
+    last in both directions, so that `keyset_filter` knows where to find them.
+    '''
+    ordering = []
+    for name, descending, nullable in keys:
+        if nullable:
+            ordering.append(F(name).desc(nulls_last=True) if descending else F(name).asc(nulls_last=True))
+        else:
+            ordering.append(f'-{name}' if descending else name)
+
+    return queryset.order_by(*ordering)
+
+
+# Cursors are versioned, so that their layout can change without
+# old cursors being misread. Each one is laid out as follows:
+#   version | id | created_at | number of other sort values | values... | mac
+CURSOR_VERSION = 1
+CURSOR_MAC_LENGTH = 12
+CURSOR_MAC_SALT = 'django_instant_rest.pagination.cursor'
+EPOCH = datetime(1970, 1, 1)
+EPOCH_UTC = EPOCH.replace(tzinfo=timezone.utc)
+
+# Every value inside a cursor is prefixed with one of these type tags
+TAG_NONE, TAG_FALSE, TAG_TRUE, TAG_INT, TAG_STR, TAG_AWARE_DATETIME, \
+    TAG_NAIVE_DATETIME, TAG_DATE, TAG_TIME, TAG_UUID, TAG_FLOAT, TAG_DECIMAL = range(12)
+
+
+def write_varint(buffer, number):
+    '''Append a signed integer to a bytearray, using zigzag varint encoding'''
+    if not -2**63 <= number < 2**63:
+        raise ValueError('Cursor integers must fit into 64 bits')
+
+    number = (number << 1) ^ (number >> 63)
+    while number > 0x7f:
+        buffer.append((number & 0x7f) | 0x80)
+        number >>= 7
+    buffer.append(number)
+
+
+def read_varint(data, position):
+    '''Read a zigzag varint, returning it along with the position after it'''
+    number = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        number |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return (number >> 1) ^ -(number & 1), position
+        if shift > 70:
+            raise ValueError('Cursor contains a malformed integer')
+
+
+def write_bytes(buffer, tag, data):
+    buffer.append(tag)
+    write_varint(buffer, len(data))
+    buffer.extend(data)
+
+
+def write_value(buffer, value):
+    '''Append a type tag, followed by a compact encoding of `value`'''
+    if value is None:
+        buffer.append(TAG_NONE)
+    elif isinstance(value, bool):
+        buffer.append(TAG_TRUE if value else TAG_FALSE)
+    elif isinstance(value, int):
+        buffer.append(TAG_INT)
+        write_varint(buffer, value)
+    elif isinstance(value, datetime):
+        aware = value.tzinfo is not None
+        delta = value - (EPOCH_UTC if aware else EPOCH)
+        buffer.append(TAG_AWARE_DATETIME if aware else TAG_NAIVE_DATETIME)
+        write_varint(buffer, (delta.days * 86400 + delta.seconds) * 10**6 + delta.microseconds)
+    elif isinstance(value, date):
+        buffer.append(TAG_DATE)
+        write_varint(buffer, value.toordinal())
+    elif isinstance(value, time):
+        buffer.append(TAG_TIME)
+        write_varint(buffer, ((value.hour * 60 + value.minute) * 60 + value.second) * 10**6 + value.microsecond)
+    elif isinstance(value, UUID):
+        buffer.append(TAG_UUID)
+        buffer.extend(value.bytes)
+    elif isinstance(value, float):
+        buffer.append(TAG_FLOAT)
+        buffer.extend(struct.pack('>d', value))
+    elif isinstance(value, Decimal):
+        write_bytes(buffer, TAG_DECIMAL, str(value).encode('utf8'))
+    else:
+        write_bytes(buffer, TAG_STR, str(value).encode('utf8'))
+
+
+def read_value(data, position):
+    '''Read a tagged value, returning it along with the position after it'''
+    tag = data[position]
+    position += 1
+
+    if tag == TAG_NONE:
+        return None, position
+    if tag in [TAG_FALSE, TAG_TRUE]:
+        return tag == TAG_TRUE, position
+    if tag == TAG_UUID:
+        return UUID(bytes=bytes(data[position:position + 16])), position + 16
+    if tag == TAG_FLOAT:
+        return struct.unpack('>d', data[position:position + 8])[0], position + 8
+
+    number, position = read_varint(data, position)
+
+    if tag == TAG_INT:
+        return number, position
+    if tag == TAG_AWARE_DATETIME:
+        return EPOCH_UTC + timedelta(microseconds=number), position
+    if tag == TAG_NAIVE_DATETIME:
+        return EPOCH + timedelta(microseconds=number), position
+    if tag == TAG_DATE:
+        return date.fromordinal(number), position
+    if tag == TAG_TIME:
+        return (datetime.min + timedelta(microseconds=number)).time(), position
+    if tag in [TAG_STR, TAG_DECIMAL]:
+        text = bytes(data[position:position + number]).decode('utf8')
+        return (Decimal(text) if tag == TAG_DECIMAL else text), position + number
+
+    raise ValueError('Cursor contains an unknown type of value')
+
+
+def cursor_mac(payload, keys):
     '''
-    Given a model instance, encode its id and created_at
-    properties into a string, called a "cursor".
+    Sign a cursor's payload, along with the ordering it belongs to,
+    so that a cursor can't be forged, or reused with another ordering.
     '''
-    id = obj['id'] if isinstance(obj, dict) else obj.id
-    created_at = obj['created_at'] if isinstance(obj, dict) else obj.created_at
-    field_strings = [ str(id), str(created_at) ]
-    payload = '|'.join(field_strings)
-    payload_bytes = payload.encode('utf8')
-    cursor_bytes = b64encode(payload_bytes)
-    cursor = cursor_bytes.decode('utf8')
-    return cursor
+    ordering = ','.join(f"{'-' if key[1] else ''}{key[0]}" for key in keys)
+    value = bytes(payload) + b'|' + ordering.encode('utf8')
+    return salted_hmac(CURSOR_MAC_SALT, value, algorithm='sha256').digest()[:CURSOR_MAC_LENGTH]
 
 
-def decode_cursor(cursor):
+def encode_cursor(obj, keys=None):
     '''
-    Given a cursor string, return the `id` and `created_at`
-    that it encodes.
+    Given a model instance, or a dictionary of its values, encode the
+    value of each sort key into a signed string, called a "cursor".
+    By default, only the `created_at` and `id` fields are encoded.
     '''
-    cursor_bytes = cursor.encode('utf8')
-    payload_bytes = b64decode(cursor_bytes)
-    payload = payload_bytes.decode('utf8')
-    field_strings = payload.split('|')
-    return {
-        "id": field_strings[0],
-        "created_at": field_strings[1],
-    }
+    keys = keys or DEFAULT_KEYS
+    get = lambda name: obj[name] if isinstance(obj, dict) else getattr(obj, name)
+    other_names = [ key[0] for key in keys if key[0] not in CURSOR_FIELDS ]
+
+    payload = bytearray([CURSOR_VERSION])
+    write_value(payload, get('id'))
+    write_value(payload, get('created_at'))
+    write_varint(payload, len(other_names))
+    for name in other_names:
+        write_value(payload, get(name))
+
+    payload.extend(cursor_mac(payload, keys))
+    return urlsafe_b64encode(bytes(payload)).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(cursor, keys=None):
+    '''
+    Given a cursor string, return a dictionary of the sort key values
+    that it encodes. A ValueError is raised, before any query runs,
+    if the cursor was tampered with or made for a different ordering.
+    '''
+    keys = keys or DEFAULT_KEYS
+    data = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+    payload, mac = data[:-CURSOR_MAC_LENGTH], data[-CURSOR_MAC_LENGTH:]
+
+    if len(payload) < 1 or not hmac.compare_digest(mac, cursor_mac(payload, keys)):
+        raise ValueError('Cursor signature is invalid')
 
-def paginate(queryset, first, last, after=None, before=None):
+    if payload[0] != CURSOR_VERSION:
+        raise ValueError('Cursor version is not supported')
+
+    try:
+        fields = {}
+        fields['id'], position = read_value(payload, 1)
+        fields['created_at'], position = read_value(payload, position)
+        count, position = read_varint(payload, position)
+
+        other_names = [ key[0] for key in keys if key[0] not in CURSOR_FIELDS ]
+        if count != len(other_names):
+            raise ValueError('Cursor does not match the ordering of the requested list')
+
+        for name in other_names:
+            fields[name], position = read_value(payload, position)
+
+    except (IndexError, struct.error) as e:
+        raise ValueError('Cursor is truncated')
+
+    return fields
+
+
+def keyset_filter(keys, fields, reverse=False):
+    '''
+    Given sort keys and decoded cursor fields, return a Q object matching
+    every row that sorts after the cursor, or before it when `reverse`
+    is True. Rows are compared on the whole tuple of sort keys, i.e.
+    `(a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z)`.
+    '''
+    condition = None
+    equal_so_far = Q()
+
+    for name, descending, nullable in keys:
+        value = fields[name]
+        lookup = 'lt' if descending != reverse else 'gt'
+
+        # Nulls sort last, so they come after every value,
+        # and can only be compared with other nulls.
+        if value is None:
+            beyond = Q(**{ f'{name}__isnull': False }) if reverse else None
+            equal = Q(**{ f'{name}__isnull': True })
+        else:
+            beyond = Q(**{ f'{name}__{lookup}': value })
+            if nullable and not reverse:
+                beyond |= Q(**{ f'{name}__isnull': True })
+            equal = Q(**{ name: value })
+
+        if beyond is not None:
+            term = equal_so_far & beyond
+            condition = term if condition is None else condition | term
+
+        equal_so_far &= equal
+
+    # The leading range condition is redundant, but it gives the query
+    # planner an index range to scan instead of a disjunction to evaluate.
+    name, descending, nullable = keys[0]
+    if not nullable:
+        lookup = 'lt' if descending != reverse else 'gt'
+        condition = Q(**{ f'{name}__{lookup}e': fields[name] }) & condition
+
+    return condition
+
+
+def probe(queryset, keys, fields, reverse, enabled):
+    '''
+    Determine whether any row lies beyond the cursor in the given
+    direction, using a single EXISTS query. Returns None without
+    querying when the probe has been disabled.
+    '''
+    if not enabled:
+        return None
+
+    return queryset.filter(keyset_filter(keys, fields, reverse=reverse)).exists()
+
+
+def paginate(queryset, first, last, after=None, before=None, probe_opposite_page=True, lazy=False):
+    '''
+    Return a page of `queryset`, along with whether there are pages before
+    and after it. Knowing about the page in the direction of travel is free,
+    but the opposite direction costs an extra query, which can be skipped by
+    passing `probe_opposite_page=False`. Its flag will then be None.
+
+    When `lazy` is True, forward pages are returned as an unevaluated
+    queryset of up to `first + 1` rows, and `has_next_page` is left for
+    the caller to determine while iterating over it. Backward pages are
+    always evaluated, because they have to be reversed in memory.
+    '''
     if (not first and not last) or (first and last) or (after and before) or (first and before) or (last and after):
         return {
             "queryset": None,
@@ -41,58 +323,74 @@ def paginate(queryset, first, last, after=None, before=None):
         }
 
     try:
+        keys = sort_keys(queryset)
+        queryset = order_for_keyset(queryset, keys)
+
         if first:
             quantity = first
-            if after is None:
-                page_plus_one = queryset.all()[:first+1]
+            if lazy:
+                fields = None if after is None else decode_cursor(after, keys)
+                page_plus_1 = queryset if after is None else queryset.filter(keyset_filter(keys, fields))
+                return {
+                    "queryset": page_plus_1[:quantity + 1],
+                    "keys": keys,
+                    "has_next_page": None,
+                    "has_prev_page": False if after is None else probe(queryset, keys, fields, True, probe_opposite_page),
+                    "error": None,
+                }
+            elif after is None:
+                page_plus_one = list(queryset.all()[:first+1])
                 page = page_plus_one[:first]
                 return {
                     "queryset": page,
+                    "keys": keys,
                     "has_prev_page": False,
                     "has_next_page": len(page_plus_one) > quantity,
                     "error": None,
                 }
             else:
-                fields = decode_cursor(after)
-                page_plus_1 = queryset.filter(created_at__gt=fields['created_at']).all()[:quantity + 1]
+                fields = decode_cursor(after, keys)
+                page_plus_1 = list(queryset.filter(keyset_filter(keys, fields)).all()[:quantity + 1])
                 has_next_page = len(page_plus_1) > quantity
-                has_prev_page = bool(len(queryset.filter(created_at__lt=fields['created_at'])))
+                has_prev_page = probe(queryset, keys, fields, True, probe_opposite_page)
                 return {
                     "queryset": page_plus_1[:quantity],
+                    "keys": keys,
                     "has_next_page": has_next_page,
                     "has_prev_page": has_prev_page,
                     "error": None,
                 }
         elif last:
             quantity = last
+
+            # Walking backwards from the end (or from the cursor) by
+            # reversing the ordering, so that the database only needs
+            # to read `last + 1` rows, regardless of the table's size.
+            backwards = queryset.reverse()
+
             if before is None:
-                index_before_first_page_element = max(0, len(queryset) - last - 1)
-                page_plus_1 = queryset.all()[index_before_first_page_element:]
-                page = page_plus_1[1:]
-                return {
-                    "queryset": page,
-                    "has_next_page": False,
-                    "has_prev_page": len(page_plus_1) > len(page),
-                    "error": None,
-                }
+                page_plus_1 = list(backwards.all()[:quantity + 1])
+                has_next_page = False
             else:
-                fields = decode_cursor(before)
-                created_at = fields["created_at"]
-                all_before_cursor = queryset.filter(created_at__lt=created_at)
-                index_before_first_page_element = max(0, len(all_before_cursor) - quantity - 1)
-                page_plus_1 = all_before_cursor[index_before_first_page_element:]
-                has_prev_page = len(page_plus_1) > quantity
-                has_next_page = bool(queryset.filter(created_at__gt=created_at).first())
-                return {
-                    "queryset": page_plus_1 if not has_prev_page else page_plus_1[1:],
-                    "has_next_page": has_next_page,
-                    "has_prev_page": has_prev_page,
-                    "error": None,
-                }
+                fields = decode_cursor(before, keys)
+                page_plus_1 = list(backwards.filter(keyset_filter(keys, fields, reverse=True))[:quantity + 1])
+                has_next_page = probe(queryset, keys, fields, False, probe_opposite_page)
+
+            # Restoring the requested ordering within the page
+            page = page_plus_1[:quantity]
+            page.reverse()
+
+            return {
+                "queryset": page,
+                "keys": keys,
+                "has_next_page": has_next_page,
+                "has_prev_page": len(page_plus_1) > quantity,
+                "error": None,
+            }
 
         raise Exception('Unreachable!')
 
-    except Base64Error as e:
+    except (Base64Error, ValueError, ValidationError) as e:
         return {
             "queryset": None,
             "has_next_page": False,
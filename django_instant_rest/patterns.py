@@ -1,51 +1,123 @@
 
 from . import views
+from .registry import register
 from django.urls import re_path
+from asgiref.sync import sync_to_async, async_to_sync
 
 
 # Create a urlpattern element that allows CRUD
-# operations for a given model. 
-def resource(name, model, middleware = None, camel=False):
+# operations for a given model. With `stream` enabled,
+# lists of objects are streamed to clients as they're read.
+# With `export` enabled, `<name>/export` streams every object
+# matching the request's filters as newline-delimited JSON.
+# With `is_async` enabled, requests are handled by coroutines,
+# for ASGI deployments.
+def resource(name, model, middleware = None, camel=False, stream=False, export=False, is_async=False):
     route = rf"^{name}/(?!authenticate$)(?P<id>.*)$|^{name}$"
+    register(model)
+
+    if is_async:
+        final_handler = views.aresource(model, camel=camel, stream=stream, export=export)
+    else:
+        final_handler = views.resource(model, camel=camel, stream=stream, export=export)
 
     if not middleware:
-        return re_path(route, views.resource(model, camel))
+        return re_path(route, final_handler)
+
+    if is_async:
+        return re_path(route, async_middleware(middleware, final_handler, takes_id = True))
 
     # Using a django-style middleware callable
     # if it was provided as a function parameter.
     # https://docs.djangoproject.com/en/3.1/topics/http/middleware/
+    # Like Django's own middleware, it's instantiated once.
+
+    def get_response(request, id = None):
+        id = id if id is not None else getattr(request, '_resource_id', None)
+        return final_handler(request, id)
+
+    middleware_callable = middleware(get_response)
 
     def handler(request, id = None):
-        def get_response(request, id = id):
-            final_handler = views.resource(model, camel=camel)
-            return final_handler(request, id)
+        request._resource_id = id
+        return middleware_callable(request, id = id)
+
+
+    return re_path(route, handler)
+
+
+# Wrap an async request handler in a django-style middleware callable,
+# passing ids along if the handler takes them. Middleware that isn't
+# marked as `async_capable` is called in a thread, with a synchronous
+# `get_response`, like Django does with its own middleware.
+def async_middleware(middleware, final_handler, takes_id = False):
+    async def get_response(request, id = None):
+        if not takes_id:
+            return await final_handler(request)
+        id = id if id is not None else getattr(request, '_resource_id', None)
+        return await final_handler(request, id)
 
+    if getattr(middleware, 'async_capable', False):
         middleware_callable = middleware(get_response)
-        response = middleware_callable(request, id = id)
-        return response
+    else:
+        middleware_callable = sync_to_async(middleware(async_to_sync(get_response)))
 
+    async def handler(request, id = None):
+        if not takes_id:
+            return await middleware_callable(request)
+        request._resource_id = id
+        return await middleware_callable(request, id = id)
 
-    return re_path(route, handler)
+    handler.csrf_exempt = True
+    return handler
 
 
 # Create a request handler that allows REST clients to authenticate.
 # In the future, it may be associated with additional actions.
-def client(name, client_model, middleware=None, camel=False):
+def client(name, client_model, middleware=None, camel=False, is_async=False):
     route = rf"^{name}/authenticate$"
+    register(client_model)
+
+    if is_async:
+        final_handler = views.aauthenticate(client_model)
+    else:
+        final_handler = views.authenticate(client_model)
 
     if not middleware:
-        return re_path(route, views.authenticate(client_model))
+        return re_path(route, final_handler)
+
+    if is_async:
+        return re_path(route, async_middleware(middleware, final_handler))
 
     # Using a django-style middleware callable
     # if it was provided as a function parameter.
     # https://docs.djangoproject.com/en/3.1/topics/http/middleware/
+    # Like Django's own middleware, it's instantiated once.
+
+    middleware_callable = middleware(final_handler)
 
     def handler(request):
-        def get_response(request):
-            return views.authenticate(client_model)(request)
+        return middleware_callable(request)
 
-        middleware_callable = middleware(get_response)
-        response = middleware_callable(request)
-        return response
+    return re_path(route, handler)
+
+
+# Create a urlpattern element that exposes the measurements
+# of every operation, in Prometheus' text exposition format.
+# Operations are only measured once `instrumentation.configure`
+# has enabled it.
+def metrics(name = 'metrics', middleware = None):
+    route = rf"^{name}$"
+    final_handler = views.metrics()
+
+    if not middleware:
+        return re_path(route, final_handler)
+
+    # Using a django-style middleware callable
+    # if it was provided as a function parameter.
+    middleware_callable = middleware(final_handler)
+
+    def handler(request):
+        return middleware_callable(request)
 
     return re_path(route, handler)
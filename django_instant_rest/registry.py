@@ -0,0 +1,80 @@
+from .casing import camel, snake, rename_keys
+from .serializers import get_serializer
+from django.db.models.fields import DateTimeField, UUIDField
+
+# Model information, keyed by model class
+_registry = {}
+
+# Lookups whose values are parsed as datetimes, for datetime fields
+DATE_LOOKUPS = ['exact', 'gt', 'gte', 'lt', 'lte']
+
+# Parameters of `read_many` that aren't model fields
+PSEUDO_FIELDS = ['total_count', 'cursor']
+
+
+class ModelInfo:
+    '''
+    Facts about a model that request handlers need on every request,
+    worked out once per model, rather than once per request.
+    '''
+
+    def __init__(self, model):
+        self.model = model
+        self.config = model.Serializer
+        self.serializer = get_serializer(model)
+        self.hidden_fields = set(model.Serializer.hidden_fields)
+
+        # How ids in URLs are converted into primary key values
+        id_field = model._meta.get_field('id')
+        self.coerce_id = (lambda id: id) if type(id_field) == UUIDField else int
+
+        # Fields that are parsed from datestrings when filtering
+        self.date_fields = [ f.name for f in model._meta.fields if type(f) == DateTimeField ]
+        self.date_params = set(self.date_fields)
+        self.date_params |= { f'{f}__{lookup}' for f in self.date_fields for lookup in DATE_LOOKUPS }
+
+        # The first part of every filter parameter that may be applied,
+        # which includes reverse relations, but not hidden fields
+        lookups = { f.name for f in model._meta.get_fields() }
+        lookups |= { f.attname for f in model._meta.concrete_fields }
+        lookups.add('pk')
+        self.filter_lookups = lookups - self.hidden_fields
+
+        # Casing of every key that may appear in a serialized object
+        keys = [ *self.serializer.keys, *self.filter_lookups, *PSEUDO_FIELDS ]
+        self.camel_keys = { key: camel(key) for key in keys }
+        self.snake_keys = { camel_key: key for key, camel_key in self.camel_keys.items() }
+
+    def to_camel(self, node):
+        '''CamelCase the keys of a serialized object'''
+        return rename_keys(node, self.camel_keys)
+
+    def to_snake(self, key):
+        '''Convert a camelCased key into a snake_cased one'''
+        name = self.snake_keys.get(key)
+        return name if name is not None else snake(key)
+
+    def invalid_filter(self, params):
+        '''Return the first filter parameter that can't be applied, if any'''
+        for key in params:
+            if key.split('__', 1)[0] not in self.filter_lookups:
+                return key
+        return None
+
+
+def register(model):
+    '''Work out the information views need about a model, ahead of requests'''
+    info = ModelInfo(model)
+    _registry[model] = info
+    return info
+
+
+def get_model_info(model):
+    '''
+    Return the information registered for a model, registering it on
+    first use, or if the model's `Serializer` configuration was replaced.
+    '''
+    info = _registry.get(model)
+    if info is None or info.config is not model.Serializer:
+        info = register(model)
+    return info
@@ -0,0 +1,80 @@
+from .casing import camel as to_camel
+from django.db.models import DateTimeField, UUIDField
+
+# Compiled serializers, keyed by model class and casing
+_serializers = {}
+
+
+def to_string(value):
+    return str(value)
+
+def to_isoformat(value):
+    return value.isoformat()
+
+
+def converter_for(field):
+    '''Choose how a field's values are converted into JSON-friendly values'''
+    if isinstance(field, UUIDField):
+        return to_string
+    if isinstance(field, DateTimeField):
+        return to_isoformat
+    return None
+
+
+class CompiledSerializer:
+    '''
+    Converts model instances into dictionaries using a field list that's
+    worked out once per model, rather than once per instance. Relational
+    fields are read from their `<name>_id` attribute, so serializing never
+    fetches a related object. With `camel`, keys are camelCased.
+    '''
+
+    def __init__(self, model, camel=False):
+        self.model = model
+        self.camel = camel
+        self.config = model.Serializer
+        self.fields = []
+
+        for field in model._meta.concrete_fields:
+            if field.name in model.Serializer.hidden_fields:
+                continue
+
+            key = field.name
+            target = field
+
+            if field.is_relation:
+                key = key if key.endswith('_id') else key + '_id'
+                target = field.target_field
+
+            key = to_camel(key) if camel else key
+            self.fields.append((key, field.attname, converter_for(target)))
+
+        self.keys = [ key for key, _, _ in self.fields ]
+        self.attnames = [ attname for _, attname, _ in self.fields ]
+
+    def __call__(self, instance):
+        '''Serialize a model instance'''
+        result = {}
+        for key, attname, convert in self.fields:
+            value = getattr(instance, attname)
+            result[key] = convert(value) if convert and value is not None else value
+        return result
+
+    def from_row(self, row):
+        '''Serialize a tuple of values, ordered like `self.attnames`'''
+        result = {}
+        for (key, _, convert), value in zip(self.fields, row):
+            result[key] = convert(value) if convert and value is not None else value
+        return result
+
+
+def get_serializer(model, camel=False):
+    '''
+    Return the compiled serializer for a model, compiling it on first use,
+    or if the model's `Serializer` configuration has been replaced.
+    '''
+    serializer = _serializers.get((model, camel))
+    if serializer is None or serializer.config is not model.Serializer:
+        serializer = CompiledSerializer(model, camel)
+        _serializers[(model, camel)] = serializer
+    return serializer
@@ -1,17 +1,24 @@
 
-from .pagination import paginate, encode_cursor
 from .casing import camel_keys, snake_keys
+from .registry import get_model_info
+from .instrumentation import measure, phase
+from .instrumentation import stream as stream_measured
+from . import instrumentation
 from .errors import *
 
 import jwt
 import json
+import hashlib
 from datetime import datetime
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
+from django.db.models import Max, Count
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.core.serializers.json import DjangoJSONEncoder
 from django.views.decorators.csrf import csrf_exempt
-from django.db.models.fields import DateTimeField, UUIDField
-from django.utils.timezone import make_aware
 from django.db.utils import IntegrityError
 from django.core.exceptions import ValidationError
+from asgiref.sync import sync_to_async
 
 id_not_exists_err = {"message": "Requested id does not exist" }
 empty_body_err = {"message" : "Request body is empty"}
@@ -52,76 +59,287 @@ def format_validation_error(e: ValidationError, camel=False):
     return errors
 
 
+def parse_date_params(model, params):
+    '''
+    Replace the datestrings found in filter params with datetimes,
+    returning the first key whose value isn't a valid datestring.
+    '''
+    date_params = get_model_info(model).date_params
+    for key in params:
+        if key in date_params:
+            try:
+                params[key] = datetime.fromisoformat(params[key])
+            except:
+                return key
 
-def date_fields(model):
+    return None
+
+
+def parse_filter_params(model, request, camel=False):
     '''
-    Return a list of strings that correspond to a model's
-    fields that are instances of DateTimeField
+    Collect the query params of a request, applying casing and
+    parsing datestrings. Returns the params, along with an error,
+    if a datestring was invalid.
     '''
-    def is_date_field(name):
-        return type(getattr(model, name).field) == DateTimeField
+    info = get_model_info(model)
+    params = { key: request.GET.get(key) for key in request.GET }
+
+    if (camel):
+        params = { info.to_snake(key): value for key, value in params.items() }
+
+    # Parsing datestrings found in params
+    invalid_key = parse_date_params(model, params)
+    if invalid_key:
+        return None, INVALID_DATE_RECIEVED(invalid_key)
+
+    return params, None
+
+
+def check_filter_params(model, filters):
+    '''Return an error for the first filter param that doesn't apply to the model'''
+    invalid_key = get_model_info(model).invalid_filter(filters)
+    return INVALID_FILTER_PARAMETER(invalid_key) if invalid_key else None
+
+
+def camel_page(model, payload):
+    '''
+    CamelCase the keys of a page of objects, renaming the keys of its
+    nodes with the model's precomputed mapping.
+    '''
+    if type(payload) != dict or type(payload.get('nodes')) != list:
+        return camel_keys(payload)
+
+    to_camel = get_model_info(model).to_camel
+    page_info = camel_keys({ key: value for key, value in payload.items() if key != 'nodes' })
+    return { **page_info, 'nodes': [ to_camel(node) for node in payload['nodes'] ] }
+
+
+def stream_json(result, rename=None, chunk_size=500):
+    '''
+    Encode the result of `stream_many` as JSON, one chunk of nodes at
+    a time, so that a page never has to be held in memory all at once.
+    Page information follows the nodes, because it's only known after
+    every node has been read. Keys are camelCased if `rename` is given,
+    which renames the keys of each node.
+    '''
+    encode = lambda value: json.dumps(value, cls=DjangoJSONEncoder)
+    payload = result['payload']
+
+    if payload is None:
+        yield encode(result)
+        return
+
+    yield '{"payload": {"nodes": ['
 
-    field_names = [f.name for f in model._meta.fields]
-    return list(filter(is_date_field, field_names))
+    separator = ''
+    chunk = []
+    for node in payload['nodes']:
+        chunk.append(encode(rename(node) if rename else node))
+        if len(chunk) == chunk_size:
+            yield separator + ', '.join(chunk)
+            separator = ', '
+            chunk = []
 
+    if len(chunk):
+        yield separator + ', '.join(chunk)
 
-def read_many(model, camel = False):
+    page_info = { key: value for key, value in payload.items() if key != 'nodes' }
+    page_info = camel_keys(page_info) if rename else page_info
+    yield '], ' + encode(page_info)[1:] + ', "errors": ' + encode(result['errors']) + '}'
+
+
+def is_conditional(request):
+    return 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+
+
+def make_etag(*parts):
+    '''Build a weak entity tag from everything a representation depends on'''
+    digest = hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+def not_modified(request, etag, last_modified):
+    '''Return a 304 response if the request's validators still match, or None'''
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+    return None if response is None else set_validators(response, etag, last_modified)
+
+
+def object_validators(model, id, updated_at, camel):
+    '''The entity tag and modification date of an object, given its `updated_at`'''
+    return make_etag(model._meta.label, id, updated_at.isoformat(), camel), updated_at
+
+
+def list_validators(model, request, filters, camel):
+    '''
+    The entity tag and modification date of a list, from the latest
+    `updated_at` and the number of its filtered rows, which change
+    whenever one of its rows is created, updated or deleted.
+    Returns None for empty lists, or filters that can't be applied.
+    '''
+    try:
+        probe = model.objects.filter(**filters).aggregate(latest=Max('updated_at'), count=Count('pk'))
+    except Exception:
+        # Leaving invalid filters for `get_many` to report
+        return None
+
+    if probe['latest'] is None:
+        return None
+
+    query = sorted(request.GET.lists())
+    etag = make_etag(model._meta.label, query, camel, probe['latest'].isoformat(), probe['count'])
+    return etag, probe['latest']
+
+
+def read_many_input(model, request, camel = False):
+    '''
+    Interpret the query params of a request for a list of objects
+    as `get_many` input. Returns the input, along with an error,
+    if the params were invalid.
+    '''
+    params, error = parse_filter_params(model, request, camel)
+    if error:
+        return None, error
+
+    # Collecting pagination params
+    first = params.pop('first', None)
+    first = int(first) if first else None
+
+    last = params.pop('last', None)
+    last = int(last) if last else None
+
+    after = params.pop('after', None)
+    before = params.pop('before', None)
+
+    probe_opposite_page = params.pop('probe_opposite_page', None)
+    probe_opposite_page = probe_opposite_page.lower() not in ['false', '0'] if probe_opposite_page else None
+
+    # Collecting ordering params
+    order_by = params.pop('order_by', None)
+    order_by = order_by.split(",") if order_by else []
+
+    # Collecting pseudo-field params
+    pseudo_fields = params.pop('pseudo_fields', None)
+    pseudo_fields = pseudo_fields.split(",") if pseudo_fields else []
+    pseudo_fields = [ get_model_info(model).to_snake(f) for f in pseudo_fields ] if camel else pseudo_fields
+    total_count_mode = params.pop('total_count_mode', None)
+
+    error = check_filter_params(model, params)
+    if error:
+        return None, error
+
+    # Aggregating params
+    input = {
+        'first': first,
+        'last': last,
+        'after': after,
+        'before': before,
+        'probe_opposite_page': probe_opposite_page,
+        'order_by': order_by,
+        'pseudo_fields': pseudo_fields,
+        'total_count_mode': total_count_mode,
+        'filters': params,
+        "auth_claims": getattr(request, 'auth_claims', None),
+    }
+
+    return input, None
+
+
+def validates_lists(model):
+    '''Whether lists are validated, which isn't done if hooks may change which rows are in them'''
+    caching = model.Caching
+    return caching.conditional and caching.conditional_lists and not model.hook_chain('get_many')[0]
+
+
+def page_response(model, results, validators = None, camel = False):
+    payload = results['payload']
+    errors = results['errors']
+
+    # Applying Camel Casing
+    if (camel):
+        with phase('casing'):
+            payload = camel_page(model, payload)
+
+    response = JsonResponse({ 'payload': payload, 'errors': errors })
+    return set_validators(response, *validators) if validators and not errors else response
+
+
+def read_many(model, camel = False, stream = False):
     def request_handler(request):
         try:
-            params = { key: request.GET.get(key) for key in request.GET }
-            queryset = None
+            input, error = read_many_input(model, request, camel)
+            if error:
+                return JsonResponse({ "payload": None, "errors": [error] })
 
-            if (camel):
-                params = snake_keys(params)
+            # Validating the list
+            validators = None
+            if validates_lists(model):
+                validators = list_validators(model, request, input['filters'], camel)
+                response = validators and not_modified(request, *validators)
+                if response is not None:
+                    return response
+
+            # Streaming large pages, instead of building them in memory
+            if stream:
+                results = model.stream_many(**input)
+                rename = get_model_info(model).to_camel if camel else None
+                chunks = stream_json(results, rename, model.Pagination.stream_chunk_size)
+                response = StreamingHttpResponse(chunks, content_type='application/json')
+                return set_validators(response, *validators) if validators else response
+
+            results = model.get_many(**input)
+            return page_response(model, results, validators, camel)
 
-            # Parsing datestrings found in params
-            for key in params:
-                for field in date_fields(model):
-                    if key.startswith(field):
-                        try:
-                            params[key] = datetime.fromisoformat(params[key])
-                        except:
-                            return JsonResponse({ "payload": None, "errors": [INVALID_DATE_RECIEVED(key)]})
+        except Exception as e:
+            error = FAILED_UNEXPECTEDLY(action = ACTION, region = REGION, exception = e)
+            return JsonResponse({ "payload": None, "errors": [error] })
 
-            # Collecting pagination params
-            first = params.pop('first', None)
-            first = int(first) if first else None
+    return request_handler
 
-            last = params.pop('last', None)
-            last = int(last) if last else None
 
-            after = params.pop('after', None)
-            before = params.pop('before', None)
+def export_many(model, camel=False):
+    def request_handler(request):
+        try:
+            params, error = parse_filter_params(model, request, camel)
+            if error:
+                return JsonResponse({ "payload": None, "errors": [error] })
 
             # Collecting ordering params
             order_by = params.pop('order_by', None)
             order_by = order_by.split(",") if order_by else []
 
-            # Aggregating params
-            get_many_args = {
-                'first': first,
-                'last': last,
-                'after': after,
-                'before': before,
-                'order_by': order_by,
-                'filters': params,
-            }
+            error = check_filter_params(model, params)
+            if error:
+                return JsonResponse({ "payload": None, "errors": [error] })
 
             input = {
-                **get_many_args,
+                'order_by': order_by,
+                'filters': params,
+                'camel': camel,
                 "auth_claims": getattr(request, 'auth_claims', None),
             }
 
-            # Collecting filter parameters
-            results = model.get_many(**input)
-            payload = results['payload']
-            errors = results['errors']
+            results = model.export_many(**input)
+            if results['payload'] is None:
+                return JsonResponse(results)
 
-            # Applying Camel Casing
-            if (camel):
-                payload = camel_keys(payload)
+            # Writing one object per line, followed by
+            # a line of errors, if any happened along the way.
+            # Objects arrive already cased.
+            def lines():
+                encode = lambda value: json.dumps(value, cls=DjangoJSONEncoder)
+                for node in results['payload']['nodes']:
+                    yield encode(node) + '\n'
 
-            return JsonResponse({ 'payload': payload, 'errors': errors })
+                if len(results['errors']):
+                    yield encode({ "errors": results['errors'] }) + '\n'
+
+            return StreamingHttpResponse(lines(), content_type='application/x-ndjson')
 
         except Exception as e:
             error = FAILED_UNEXPECTEDLY(action = ACTION, region = REGION, exception = e)
@@ -130,23 +348,56 @@ def read_many(model, camel = False):
     return request_handler
 
 
+def object_not_modified(model, request, id, camel = False):
+    '''
+    Answer a conditional request for an object from its `updated_at`
+    alone, unless hooks may decide whether it can be read at all.
+    Returns a 304 response if the request's validators still match.
+    '''
+    conditional = model.Caching.conditional
+    if conditional and is_conditional(request) and not model.hook_chain('get_one')[0]:
+        updated_at = model.objects.filter(pk=id).values_list('updated_at', flat=True).first()
+        if updated_at:
+            return not_modified(request, *object_validators(model, id, updated_at, camel))
+
+    return None
+
+
+def object_response(model, request, id, result, camel = False):
+    # Validating the object that was read, which still
+    # spares sending it to clients that already have it
+    validators = None
+    payload = result['payload']
+    if model.Caching.conditional and payload and payload.get('updated_at'):
+        updated_at = datetime.fromisoformat(payload['updated_at'])
+        validators = object_validators(model, id, updated_at, camel)
+        response = not_modified(request, *validators)
+        if response is not None:
+            return response
+
+    if camel:
+        result= camel_keys(result)
+
+    response = JsonResponse(result)
+    return set_validators(response, *validators) if validators else response
+
+
 def read_one(model, camel=False):
     def request_handler(request, id):
         try:
-            id_field = model._meta.get_field('id')
-            clean_id = id if type(id_field) == UUIDField else int(id)
+            clean_id = get_model_info(model).coerce_id(id)
 
             input = {
                 "id": clean_id,
                 "auth_claims": getattr(request, 'auth_claims', None),
             }
 
-            result = model.get_one(**input)
-
-            if camel:
-                result= camel_keys(result)
+            response = object_not_modified(model, request, clean_id, camel)
+            if response is not None:
+                return response
 
-            return JsonResponse(result)
+            result = model.get_one(**input)
+            return object_response(model, request, clean_id, result, camel)
 
         except Exception as e:
             error = FAILED_UNEXPECTEDLY(action = ACTION, region = REGION, exception = e)
@@ -164,6 +415,19 @@ def create_one(model, camel=False):
             if camel:
                 fields = snake_keys(fields)
 
+            # Creating every object in a JSON array at once
+            if type(fields) == list:
+                input = {
+                    "objects": fields,
+                    "auth_claims": getattr(request, 'auth_claims', None),
+                }
+
+                result = model.create_many(**input)
+                if camel:
+                    result = camel_keys(result)
+
+                return JsonResponse(result)
+
             input = {
                 **fields,
                 "auth_claims": getattr(request, 'auth_claims', None),
@@ -211,8 +475,7 @@ def update_one(model, camel=False):
     def request_handler(request, id): 
         try:
             input = json.loads(request.body.decode("utf-8"))
-            id_field = model._meta.get_field('id')
-            clean_id = id if type(id_field) == UUIDField else int(id)
+            clean_id = get_model_info(model).coerce_id(id)
             input['id'] = clean_id
             if camel:
                 input = snake_keys(input)
@@ -242,14 +505,8 @@ def update_one(model, camel=False):
 def delete_one(model, camel=False):
     @csrf_exempt
     def request_handler(request, id):
-        # TODO is this try block necessary?
         try:
-            id_field = model._meta.get_field('id')
-        except Exception as e:
-            return JsonResponse({ "payload": None, "errors": [id_not_exists_err] })
-
-        try:
-            clean_id = id if type(id_field) == UUIDField else int(id)
+            clean_id = get_model_info(model).coerce_id(id)
 
             input = {
                 "id": clean_id,
@@ -270,103 +527,518 @@ def delete_one(model, camel=False):
     return request_handler
 
 
-def resource(model, camel=False):
+def bulk_params(model, request, camel=False):
+    '''
+    Collect the filters and `dry_run` flag of a bulk operation from the
+    query string, using the same grammar as `read_many`. Returns the
+    input for the operation, along with an error, if there was one.
+    '''
+    params, error = parse_filter_params(model, request, camel)
+    if error:
+        return None, error
+
+    dry_run = params.pop('dry_run', None)
+    dry_run = dry_run.lower() not in ['false', '0'] if dry_run else False
+
+    # Leaving `unique_fields` for upserts to collect
+    unique_fields = params.pop('unique_fields', None)
+    error = check_filter_params(model, params)
+    if error:
+        return None, error
+
+    if unique_fields is not None:
+        params['unique_fields'] = unique_fields
+
+    input = {
+        'filters': params,
+        'dry_run': dry_run,
+        "auth_claims": getattr(request, 'auth_claims', None),
+    }
+
+    return input, None
+
+
+def update_many(model, camel=False):
     @csrf_exempt
-    def request_handler(request, id=None):
+    def request_handler(request):
+        try:
+            input, error = bulk_params(model, request, camel)
+            if error:
+                return JsonResponse({ "payload": None, "errors": [error] })
 
-        auth = request.headers.get('Authorization', None)
-        secret_key = getattr(request, '_secret_key', None)
+            fields = json.loads(request.body.decode("utf-8")) if request.body else {}
+            if camel:
+                fields = snake_keys(fields)
 
-        if auth and secret_key:
-            try:
-                if not auth.startswith('Bearer '):
-                    error = INVALID_AUTHORIZATION_HEADER
-                    return JsonResponse({ "payload": None, "errors": [error] })
+            # Creating or updating every object in a JSON array at once,
+            # matching stored objects by the `unique_fields` param.
+            if type(fields) == list:
+                unique_fields = input['filters'].pop('unique_fields', None)
+                unique_fields = unique_fields.split(",") if unique_fields else []
+                unique_fields = [ get_model_info(model).to_snake(f) for f in unique_fields ] if camel else unique_fields
+
+                input = {
+                    "objects": fields,
+                    "unique_fields": unique_fields,
+                    "auth_claims": input['auth_claims'],
+                }
+
+                result = model.upsert_many(**input)
+            else:
+                result = model.update_many(**input, fields=fields)
+
+            if camel:
+                result = camel_keys(result)
+
+            return JsonResponse(result)
+
+        except json.JSONDecodeError as e:
+            return JsonResponse({ "payload": None, "errors": [INVALID_JSON_RECEIVED(e)] })
+
+        except Exception as e:
+            error = FAILED_UNEXPECTEDLY(action = ACTION, region = REGION, exception = e)
+            return JsonResponse({ "payload": None, "errors": [error] })
+
+    return request_handler
 
-                token = auth.replace('Bearer ', '')
-                claims = jwt.decode(token, secret_key, algorithms=["HS256"])
-                request.auth_claims = claims
 
-            except jwt.exceptions.InvalidSignatureError as e:
-                error = INVALID_AUTH_SIGNATURE
+def delete_many(model, camel=False):
+    @csrf_exempt
+    def request_handler(request):
+        try:
+            input, error = bulk_params(model, request, camel)
+            if error:
                 return JsonResponse({ "payload": None, "errors": [error] })
 
-            except Exception as e:
-                error = FAILED_UNEXPECTEDLY(action = 'applying auth token', region = 'AUTHENTICATION', exception = e)
+            result = model.delete_many(**input)
+
+            if camel:
+                result = camel_keys(result)
+
+            return JsonResponse(result)
+
+        except Exception as e:
+            error = FAILED_UNEXPECTEDLY(action = ACTION, region = REGION, exception = e)
+            return JsonResponse({ "payload": None, "errors": [error] })
+
+    return request_handler
+
+
+def authorize(request):
+    '''
+    Decode the bearer token of a request into its `auth_claims`,
+    if there's a secret key to verify it with. Returns a response
+    if the token was invalid.
+    '''
+    auth = request.headers.get('Authorization', None)
+    secret_key = getattr(request, '_secret_key', None)
+
+    if auth and secret_key:
+        try:
+            if not auth.startswith('Bearer '):
+                error = INVALID_AUTHORIZATION_HEADER
                 return JsonResponse({ "payload": None, "errors": [error] })
 
-        # POST
-        if request.method =='POST':
-            return create_one(model, camel)(request)
+            token = auth.replace('Bearer ', '')
+            claims = jwt.decode(token, secret_key, algorithms=["HS256"])
+            request.auth_claims = claims
 
-        # GET 
-        elif request.method =='GET':
-            if id:
-                return read_one(model, camel)(request, id)
-            else:
-                return read_many(model, camel)(request)
+        except jwt.exceptions.InvalidSignatureError as e:
+            error = INVALID_AUTH_SIGNATURE
+            return JsonResponse({ "payload": None, "errors": [error] })
 
-        # PUT
-        elif request.method == 'PUT':
-            if id:
-                return update_one(model, camel)(request, id)
-            else:
-                return JsonResponse({"errors": [missing_id_err]})
+        except Exception as e:
+            error = FAILED_UNEXPECTEDLY(action = 'applying auth token', region = 'AUTHENTICATION', exception = e)
+            return JsonResponse({ "payload": None, "errors": [error] })
+
+    return None
+
+
+def finish_measurement(measurement, response):
+    '''Count the bytes of a response, measuring streams until their last chunk is produced'''
+    if measurement is None:
+        return response
+
+    if response.streaming:
+        measurement.defer()
+        response.streaming_content = stream_measured(measurement, iter(response.streaming_content))
+    else:
+        measurement.bytes += len(response.content)
+
+    return response
+
+
+# Naming the operations requests are measured as. Operations
+# like `create_many` rename them, once they're performed.
+COLLECTION_OPERATIONS = { 'GET': 'get_many', 'POST': 'create_one', 'PUT': 'update_many', 'DELETE': 'delete_many' }
+INSTANCE_OPERATIONS = { 'GET': 'get_one', 'PUT': 'update_one', 'DELETE': 'delete_one' }
 
-        # DELETE
-        elif request.method =='DELETE':
-            if id:
-                return delete_one(model, camel)(request, id)
-            else:
-                return JsonResponse({"errors": [missing_id_err]})
+
+def resource(model, camel=False, stream=False, export=False):
+    # Building every handler once, and dispatching
+    # requests to them by method, and by whether an id was given.
+    collection_handlers = {
+        'GET': read_many(model, camel, stream),
+        'POST': create_one(model, camel),
+        'PUT': update_many(model, camel),
+        'DELETE': delete_many(model, camel),
+    }
+
+    instance_handlers = {
+        'GET': read_one(model, camel),
+        'PUT': update_one(model, camel),
+        'DELETE': delete_one(model, camel),
+    }
+
+    export_handler = export_many(model, camel) if export else None
+
+    def measured(handler, operation, *args):
+        with measure(model, operation, tentative=True) as measurement:
+            return finish_measurement(measurement, handler(*args))
+
+    @csrf_exempt
+    def request_handler(request, id=None):
+        response = authorize(request)
+        if response is not None:
+            return response
+
+        method = request.method
+
+        # Exporting every matching object
+        if export_handler and id == 'export' and method == 'GET':
+            return measured(export_handler, 'export_many', request)
+
+        # Creating objects, whether or not an id was given
+        if id and method != 'POST':
+            handler = instance_handlers.get(method)
+            if handler:
+                return measured(handler, INSTANCE_OPERATIONS[method], request, id)
 
         else:
-            return JsonResponse({"errors" : [unsupported_method_err]})
+            handler = collection_handlers.get(method)
+            if handler:
+                return measured(handler, COLLECTION_OPERATIONS[method], request)
+
+        return JsonResponse({"errors" : [unsupported_method_err]})
 
     return request_handler
 
+def metrics():
+    def request_handler(request):
+        '''Expose the measurements of every operation as plain text'''
+        render = getattr(instrumentation.sink, 'render', None)
+        if render is None:
+            return HttpResponse(status=404)
+
+        return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    return request_handler
+
+
+def read_credentials(client_model, request):
+    '''
+    Read the username/password combination in the body of a request.
+    Returns the credentials, or a response if they weren't provided.
+    '''
+    try:
+        body = request.body.decode("utf-8")
+        creds = json.loads(body)
+
+        username_field = client_model.Auth.username_field
+        password_field = client_model.Auth.password_field
+
+        if not username_field in creds or not password_field in creds:
+            e = INVALID_AUTH_ATTEMPT(username_field, password_field)
+            return None, JsonResponse({ "payload": None, "errors": [e] })
+
+        return creds, None
+
+    except json.JSONDecodeError as e:
+        return None, JsonResponse({ "payload": None, "errors": [INVALID_JSON_RECEIVED(e)] }, status=400)
+
+
+def exchange_credentials(client_model, creds):
+    '''Exchange a username/password combination for a json web token'''
+    try:
+        filters = {}
+        username_field = client_model.Auth.username_field
+        password_field = client_model.Auth.password_field
+        filters[username_field] = creds.get(username_field, None)
+
+        c = client_model.objects.get(**filters)
+        auth_result = c.authenticate(creds[password_field])
+        token = auth_result.get("payload", None)
+        errors = auth_result.get("errors", [])
+
+        if len(errors):
+            return JsonResponse({ "payload": None, "errors": errors })
+
+        return JsonResponse({ "payload": { "token": token }, "errors": [] })
+
+    except client_model.DoesNotExist as e:
+        return JsonResponse({ "payload": None, "errors": [INCORRECT_AUTH_CREDENTIALS] }, status=400)
+
+    except client_model.MultipleObjectsReturned as e:
+        error = NON_UNIQUE_USERNAME_FIELD(client_model)
+        return JsonResponse({ "payload": None, "errors": [error] }, status=500)
+
+    except Exception as e:
+        error = FAILED_UNEXPECTEDLY(action = ACTION, region = REGION, exception = e)
+        return JsonResponse({ "payload": None, "errors": [error] }, status=500)
+
+
 def authenticate(client_model):
     @csrf_exempt
     def handler(request):
         '''Allows requesters to provide username/password
         combinations in exchange for a json web token'''
         try:
-            body = request.body.decode("utf-8")
-            creds = json.loads(body)
+            creds, response = read_credentials(client_model, request)
+            if response is not None:
+                return response
 
-            filters = {}
-            username_field = client_model.Auth.username_field
-            password_field = client_model.Auth.password_field
+            return exchange_credentials(client_model, creds)
+
+        except Exception as e:
+            error = FAILED_UNEXPECTEDLY(action = ACTION, region = REGION, exception = e)
+            return JsonResponse({ "payload": None, "errors": [error] }, status=500)
 
-            if not username_field in creds or not password_field in creds:
-                e = INVALID_AUTH_ATTEMPT(username_field, password_field)
-                return JsonResponse({ "payload": None, "errors": [e] })
+    return handler
 
-            filters[username_field] = creds.get(username_field, None)
 
+# Async request handlers, for ASGI deployments. Operations are
+# awaited, so that the event loop can serve other requests while
+# they wait on the database. Streams, exports and bulk updates or
+# deletions are handled by the synchronous handlers, in a thread.
+# Django 4.0 iterates streamed responses on the event loop, where
+# the database can't be read, so streams are read in the thread too.
 
-            c = client_model.objects.get(**filters)
-            auth_result = c.authenticate(creds[password_field])
-            token = auth_result.get("payload", None)
-            errors = auth_result.get("errors", [])
+def aread_many(model, camel = False):
+    async def request_handler(request):
+        try:
+            input, error = read_many_input(model, request, camel)
+            if error:
+                return JsonResponse({ "payload": None, "errors": [error] })
+
+            # Validating the list
+            validators = None
+            if validates_lists(model):
+                validators = await sync_to_async(list_validators)(model, request, input['filters'], camel)
+                response = validators and not_modified(request, *validators)
+                if response is not None:
+                    return response
+
+            results = await model.aget_many(**input)
+            return page_response(model, results, validators, camel)
+
+        except Exception as e:
+            error = FAILED_UNEXPECTEDLY(action = ACTION, region = REGION, exception = e)
+            return JsonResponse({ "payload": None, "errors": [error] })
+
+    return request_handler
+
+
+def aread_one(model, camel = False):
+    async def request_handler(request, id):
+        try:
+            clean_id = get_model_info(model).coerce_id(id)
+
+            input = {
+                "id": clean_id,
+                "auth_claims": getattr(request, 'auth_claims', None),
+            }
+
+            if is_conditional(request):
+                response = await sync_to_async(object_not_modified)(model, request, clean_id, camel)
+                if response is not None:
+                    return response
+
+            result = await model.aget_one(**input)
+            return object_response(model, request, clean_id, result, camel)
+
+        except Exception as e:
+            error = FAILED_UNEXPECTEDLY(action = ACTION, region = REGION, exception = e)
+            return JsonResponse({ "payload": None, "errors": [error] })
+
+    return request_handler
+
+
+def acreate_one(model, camel = False):
+    async def request_handler(request):
+        try:
+            fields = json.loads(request.body.decode("utf-8"))
+            if camel:
+                fields = snake_keys(fields)
+
+            # Creating every object in a JSON array at once
+            if type(fields) == list:
+                input = {
+                    "objects": fields,
+                    "auth_claims": getattr(request, 'auth_claims', None),
+                }
+
+                result = await model.acreate_many(**input)
+                if camel:
+                    result = camel_keys(result)
+
+                return JsonResponse(result)
+
+            input = {
+                **fields,
+                "auth_claims": getattr(request, 'auth_claims', None),
+            }
+
+            result = await model.acreate_one(**input)
+            payload = result['payload']
+            errors = result['errors']
 
             if len(errors):
-                return JsonResponse({ "payload": None, "errors": errors })
+                return JsonResponse({ "payload": None, "errors" : errors })
+
+            if camel:
+                payload = camel_keys(payload)
 
-            return JsonResponse({ "payload": { "token": token }, "errors": [] })
+            return JsonResponse({ "payload" : payload, "errors": [] })
 
-        except client_model.DoesNotExist as e:
-            return JsonResponse({ "payload": None, "errors": [INCORRECT_AUTH_CREDENTIALS] }, status=400)
+        except json.JSONDecodeError as e:
+            return JsonResponse({ "payload": None, "errors": [INVALID_JSON_RECEIVED(e)] })
 
-        except client_model.MultipleObjectsReturned as e:
-            error = NON_UNIQUE_USERNAME_FIELD(client_model)
-            return JsonResponse({ "payload": None, "errors": [error] }, status=500)
+        except Exception as e:
+            error = FAILED_UNEXPECTEDLY(action = ACTION, region = REGION, exception = e)
+            return JsonResponse({ "payload": None, "errors": [error] })
+
+    return request_handler
+
+
+def aupdate_one(model, camel = False):
+    async def request_handler(request, id):
+        try:
+            input = json.loads(request.body.decode("utf-8"))
+            clean_id = get_model_info(model).coerce_id(id)
+            input['id'] = clean_id
+            if camel:
+                input = snake_keys(input)
+
+            input = {
+                **input,
+                "auth_claims": getattr(request, 'auth_claims', None),
+            }
+
+            result = await model.aupdate_one(**input)
+
+            if camel:
+                result = camel_keys(result)
+
+            return JsonResponse(result)
 
         except json.JSONDecodeError as e:
-            return JsonResponse({ "payload": None, "errors": [INVALID_JSON_RECEIVED(e)] }, status=400)
+            return JsonResponse({ "payload": None, "errors": [INVALID_JSON_RECEIVED(e)] })
+
+        except Exception as e:
+            error = FAILED_UNEXPECTEDLY(action = ACTION, region = REGION, exception = e)
+            return JsonResponse({ "payload": None, "errors": [error] })
+
+    return request_handler
+
+
+def adelete_one(model, camel = False):
+    async def request_handler(request, id):
+        try:
+            clean_id = get_model_info(model).coerce_id(id)
+
+            input = {
+                "id": clean_id,
+                "auth_claims": getattr(request, 'auth_claims', None),
+            }
+
+            result = await model.adelete_one(**input)
+
+            if camel:
+                result = camel_keys(result)
+
+            return JsonResponse(result)
+
+        except Exception as e:
+            error = FAILED_UNEXPECTEDLY(action = ACTION, region = REGION, exception = e)
+            return JsonResponse({ "payload": None, "errors": [error] })
+
+    return request_handler
+
+
+def aresource(model, camel=False, stream=False, export=False):
+    '''Like `resource`, but returns a request handler that's a coroutine function'''
+
+    def buffered(handler, operation):
+        def buffered_handler(*args):
+            with measure(model, operation):
+                response = handler(*args)
+                if response.streaming:
+                    response.streaming_content = list(response.streaming_content)
+                return response
+
+        return sync_to_async(buffered_handler)
+
+    collection_handlers = {
+        'GET': buffered(read_many(model, camel, stream), 'get_many') if stream else aread_many(model, camel),
+        'POST': acreate_one(model, camel),
+        'PUT': sync_to_async(update_many(model, camel)),
+        'DELETE': sync_to_async(delete_many(model, camel)),
+    }
+
+    instance_handlers = {
+        'GET': aread_one(model, camel),
+        'PUT': aupdate_one(model, camel),
+        'DELETE': adelete_one(model, camel),
+    }
+
+    export_handler = buffered(export_many(model, camel), 'export_many') if export else None
+
+    async def measured(handler, operation, *args):
+        with measure(model, operation, tentative=True) as measurement:
+            return finish_measurement(measurement, await handler(*args))
+
+    async def request_handler(request, id=None):
+        response = authorize(request)
+        if response is not None:
+            return response
+
+        method = request.method
+
+        # Exporting every matching object
+        if export_handler and id == 'export' and method == 'GET':
+            return await measured(export_handler, 'export_many', request)
+
+        # Creating objects, whether or not an id was given
+        if id and method != 'POST':
+            handler = instance_handlers.get(method)
+            if handler:
+                return await measured(handler, INSTANCE_OPERATIONS[method], request, id)
+
+        else:
+            handler = collection_handlers.get(method)
+            if handler:
+                return await measured(handler, COLLECTION_OPERATIONS[method], request)
+
+        return JsonResponse({"errors" : [unsupported_method_err]})
+
+    # Marking the handler itself, since `csrf_exempt` would hide that it's a coroutine function
+    request_handler.csrf_exempt = True
+    return request_handler
+
+
+def aauthenticate(client_model):
+    async def handler(request):
+        '''Like `authenticate`, checking passwords in a thread'''
+        try:
+            creds, response = read_credentials(client_model, request)
+            if response is not None:
+                return response
+
+            return await sync_to_async(exchange_credentials)(client_model, creds)
 
         except Exception as e:
             error = FAILED_UNEXPECTEDLY(action = ACTION, region = REGION, exception = e)
             return JsonResponse({ "payload": None, "errors": [error] }, status=500)
 
+    handler.csrf_exempt = True
     return handler
@@ -0,0 +1,220 @@
+from bookstore.models import Author, Book
+from ecommerce.models import Product, Variant
+from django_instant_rest.pagination import encode_cursor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+import django
+import datetime
+import platform
+import statistics
+import time
+import json
+
+# How many rows are written by each INSERT while seeding
+SEED_BATCH_SIZE = 10_000
+PAGE_SIZE = 50
+
+
+def parse_size(size):
+    '''"10k" -> 10000, "1M" -> 1000000'''
+    multipliers = { 'k': 1_000, 'm': 1_000_000 }
+    suffix = size[-1].lower()
+    if suffix in multipliers:
+        return int(float(size[:-1]) * multipliers[suffix])
+    return int(size)
+
+
+def seed(rows):
+    '''Fill the bookstore and ecommerce tables with `rows` books and variants'''
+    for model in [Book, Author, Variant, Product]:
+        model.objects.all().delete()
+
+    authors = [ Author(first_name=f"First {i}", last_name=f"Last {i}") for i in range(max(rows // 10, 1)) ]
+    Author.objects.bulk_create(authors, batch_size=SEED_BATCH_SIZE)
+    author_ids = list(Author.objects.values_list('id', flat=True))
+
+    for start in range(0, rows, SEED_BATCH_SIZE):
+        books = [
+            Book(title=f"Book {i}", author_id=author_ids[i % len(author_ids)])
+            for i in range(start, min(start + SEED_BATCH_SIZE, rows))
+        ]
+        Book.objects.bulk_create(books)
+
+    products = [ Product(name=f"Product {i}", slug=f"product-{i}") for i in range(max(rows // 10, 1)) ]
+    Product.objects.bulk_create(products, batch_size=SEED_BATCH_SIZE)
+    product_ids = list(Product.objects.values_list('id', flat=True))
+
+    for start in range(0, rows, SEED_BATCH_SIZE):
+        variants = [
+            Variant(name=f"Variant {i}", slug=f"variant-{i}", price_in_cents_usd=i, product_id=product_ids[i % len(product_ids)])
+            for i in range(start, min(start + SEED_BATCH_SIZE, rows))
+        ]
+        Variant.objects.bulk_create(variants)
+
+
+def cases(client, rows, repeat):
+    '''Return every benchmarked request, by name, as a function of the repetition'''
+    middle = Book.objects.order_by('created_at', 'id').values('created_at', 'id')[rows // 2]
+    cursor = encode_cursor(middle)
+    book_ids = list(Book.objects.order_by('id').values_list('id', flat=True)[:1000])
+    author_id = Author.objects.values_list('id', flat=True).first()
+
+    # Creating a book for every repetition of `delete_one` to delete
+    doomed = Book.objects.bulk_create([ Book(title=f"Doomed {i}", author_id=author_id) for i in range(repeat + 1) ])
+    doomed_ids = [ book.id for book in doomed ]
+
+    return {
+        'get_many_first': lambda i: client.get(f'/books?first={PAGE_SIZE}'),
+        'get_many_after': lambda i: client.get(f'/books?first={PAGE_SIZE}&after={cursor}'),
+        'get_many_last': lambda i: client.get(f'/books?last={PAGE_SIZE}'),
+        'get_many_before': lambda i: client.get(f'/books?last={PAGE_SIZE}&before={cursor}'),
+        'get_many_filtered': lambda i: client.get(f'/books?first={PAGE_SIZE}&title__startswith=Book 1'),
+        'get_many_ordered': lambda i: client.get(f'/books?first={PAGE_SIZE}&order_by=-title'),
+        'get_many_camel': lambda i: client.get(f'/camel-books?first={PAGE_SIZE}'),
+        'get_many_products': lambda i: client.get(f'/products?first={PAGE_SIZE}'),
+        'get_one': lambda i: client.get(f'/books/{book_ids[rows // 2 % len(book_ids)]}'),
+        'create_one': lambda i: client.post(
+            '/books',
+            content_type='application/json',
+            data={ 'title': f'New Book {i}', 'author': author_id },
+        ),
+        'update_one': lambda i: client.put(
+            f'/books/{book_ids[0]}',
+            content_type='application/json',
+            data={ 'title': f'Updated Book {i}' },
+        ),
+        'delete_one': lambda i: client.delete(f'/books/{doomed_ids[i]}'),
+    }
+
+
+def check(response):
+    '''Raise if a request failed, which the library reports in the body, rather than by status'''
+    if response.status_code != 200:
+        raise CommandError(f'Request failed with status {response.status_code}')
+
+    errors = json.loads(response.content)['errors']
+    if errors:
+        raise CommandError(f'Request failed with errors {errors}')
+
+
+def run(case, repeat):
+    '''Time a case, and count the queries of its first run'''
+    queries = []
+    def count_query(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count_query):
+        response = case(0)
+    check(response)
+
+    timings = []
+    for i in range(1, repeat + 1):
+        started_at = time.perf_counter()
+        response = case(i)
+        timings.append((time.perf_counter() - started_at) * 1000)
+        check(response)
+
+    timings.sort()
+    return {
+        'median_ms': round(statistics.median(timings), 4),
+        'min_ms': round(timings[0], 4),
+        'p95_ms': round(timings[min(int(len(timings) * 0.95), len(timings) - 1)], 4),
+        'queries': len(queries),
+    }
+
+
+def compare(results, baseline, threshold):
+    '''
+    List the cases that are slower than the baseline by more than
+    `threshold` (a fraction of the baseline's median), or that make
+    more queries than they used to.
+    '''
+    regressions = []
+    for size, size_results in results['results'].items():
+        for name, result in size_results.items():
+            before = baseline['results'].get(size, {}).get(name)
+            if not before:
+                continue
+
+            ratio = result['median_ms'] / before['median_ms'] if before['median_ms'] else 1
+            if ratio > 1 + threshold or result['queries'] > before['queries']:
+                regressions.append({
+                    'size': size,
+                    'case': name,
+                    'ratio': round(ratio, 3),
+                    'queries': [before['queries'], result['queries']],
+                })
+
+    return regressions
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the REST hot paths against seeded bookstore and ecommerce tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10k', help='Comma-separated row counts, like "10k,100k,1M"')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per case')
+        parser.add_argument('--cases', default='', help='Comma-separated case names to run (default: all)')
+        parser.add_argument('--output', help='Write results as JSON to this file, instead of stdout')
+        parser.add_argument('--compare', help='A JSON file of earlier results, to flag regressions against')
+        parser.add_argument('--threshold', type=float, default=0.2, help='Allowed slowdown, as a fraction of the baseline')
+
+    def handle(self, *args, **options):
+        # Working in a throwaway database, like the test runner does
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+        try:
+            results = {
+                'meta': {
+                    'django': django.get_version(),
+                    'python': platform.python_version(),
+                    'database': connection.vendor,
+                    'repeat': options['repeat'],
+                    'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                },
+                'results': {},
+            }
+
+            selected = [ name for name in options['cases'].split(',') if name ]
+            client = Client()
+
+            for size in options['sizes'].split(','):
+                rows = parse_size(size)
+                self.stderr.write(f'Seeding {rows} rows')
+                seed(rows)
+
+                size_results = {}
+                for name, case in cases(client, rows, options['repeat']).items():
+                    if selected and name not in selected:
+                        continue
+                    size_results[name] = run(case, options['repeat'])
+                    self.stderr.write(f'  {name}: {size_results[name]["median_ms"]}ms')
+
+                results['results'][str(rows)] = size_results
+
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)
+
+            regressions = compare(results, baseline, options['threshold'])
+            for r in regressions:
+                self.stderr.write(f'Regression in {r["case"]} at {r["size"]} rows: {r["ratio"]}x median, queries {r["queries"][0]} -> {r["queries"][1]}')
+
+            if regressions:
+                raise CommandError(f'{len(regressions)} regression(s) against {options["compare"]}')
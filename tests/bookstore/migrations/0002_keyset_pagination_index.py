@@ -0,0 +1,61 @@
+# Generated by Django 4.0.2 on 2026-10-18 15:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookstore', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='author',
+            name='bookstore_a_created_da62fc_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='book',
+            name='bookstore_b_created_9e43dd_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='bookinventory',
+            name='bookstore_b_created_ce1a6c_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='customer',
+            name='bookstore_c_created_71449b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='employee',
+            name='bookstore_e_created_36f92c_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='inventorylocation',
+            name='bookstore_i_created_23126c_idx',
+        ),
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['created_at', 'id'], name='bookstore_a_created_b29f74_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['created_at', 'id'], name='bookstore_b_created_c022e5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookinventory',
+            index=models.Index(fields=['created_at', 'id'], name='bookstore_b_created_8c5477_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['created_at', 'id'], name='bookstore_c_created_71a242_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['created_at', 'id'], name='bookstore_e_created_5f16d5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorylocation',
+            index=models.Index(fields=['created_at', 'id'], name='bookstore_i_created_2f4d13_idx'),
+        ),
+    ]
@@ -1,9 +1,17 @@
 
-from .models import Author, Book, Customer
+from .models import Author, Book, Customer, Employee, InventoryLocation
 from django_instant_rest.errors import *
-from django_instant_rest.models import RestResource
+from django_instant_rest.models import RestResource, with_index, supports_delete_returning
+from django_instant_rest import instrumentation, caching
 from django.test import TestCase, tag
-from django.db import models
+from django.test.utils import CaptureQueriesContext
+from django.db import models, connection
+from asgiref.sync import async_to_sync
+from types import SimpleNamespace
+import threading
+import asyncio
+import time
+import uuid
 
 class TestModelMethods(TestCase):
     @classmethod
@@ -16,6 +24,23 @@ class TestModelMethods(TestCase):
         the_secret_adversary = Book.objects.create(title="The Secret Adversary", author=agatha)
         dragon_ball = Book.objects.create(title="Dragon Ball", author=akira)
 
+    def use_caching(self, model, config):
+        '''Configure a model's caching for one test, leaving nothing cached, in flight, or connected'''
+        original = vars(model).get('Caching')
+        model.Caching = config
+
+        # Connecting the model, as defining it with `Caching` would
+        caching.connect(model)
+
+        def restore():
+            caching.disconnect(model)
+            if original is None:
+                del model.Caching
+            else:
+                model.Caching = original
+
+        self.addCleanup(restore)
+
     def test_get_many_can_apply_filters(self):
         result = Author.get_many(filters = { "first_name__startswith": "A" })
         self.assertEqual(len(result['payload']['nodes']), 2)
@@ -56,6 +81,100 @@ class TestModelMethods(TestCase):
         self.assertEqual(len(result['payload']['nodes']), 1)
         self.assertEqual(len(result['errors']), 0)
 
+    def test_get_many_pages_through_identical_timestamps(self):
+        timestamp = Author.objects.first().created_at
+        Author.objects.update(created_at=timestamp)
+
+        seen = []
+        result = Author.get_many(first = 1)
+        while True:
+            seen += [ node['id'] for node in result['payload']['nodes'] ]
+            if not result['payload']['has_next_page']:
+                break
+            result = Author.get_many(first = 1, after = result['payload']['last_cursor'])
+
+        self.assertEqual(seen, sorted(Author.objects.values_list('id', flat=True)))
+
+    def test_get_many_backward_pagination_returns_whole_short_lists(self):
+        result = Author.get_many(last = 5)
+        self.assertEqual(result['payload']['has_prev_page'], False)
+        self.assertEqual(
+            [ node['first_name'] for node in result['payload']['nodes'] ],
+            [ 'Stephen', 'Agatha', 'Akira' ],
+        )
+
+    def test_get_many_pages_backward_through_identical_timestamps(self):
+        timestamp = Author.objects.first().created_at
+        Author.objects.update(created_at=timestamp)
+
+        seen = []
+        result = Author.get_many(last = 1)
+        while True:
+            seen = [ node['id'] for node in result['payload']['nodes'] ] + seen
+            if not result['payload']['has_prev_page']:
+                break
+            result = Author.get_many(last = 1, before = result['payload']['first_cursor'])
+
+        self.assertEqual(seen, sorted(Author.objects.values_list('id', flat=True)))
+
+    def test_get_many_can_skip_probing_the_opposite_page(self):
+        cursor = Author.get_many(first = 2)['payload']['last_cursor']
+
+        with self.assertNumQueries(2):
+            result = Author.get_many(first = 1, after = cursor)
+        self.assertEqual(result['payload']['has_prev_page'], True)
+
+        with self.assertNumQueries(1):
+            result = Author.get_many(first = 1, after = cursor, probe_opposite_page = False)
+        self.assertIsNone(result['payload']['has_prev_page'])
+        self.assertEqual(result['payload']['nodes'][0]['first_name'], 'Akira')
+
+    def test_get_many_paginates_by_order_by_fields(self):
+        names = []
+        result = Author.get_many(first = 1, order_by = ['-first_name'])
+        while True:
+            names += [ node['first_name'] for node in result['payload']['nodes'] ]
+            if not result['payload']['has_next_page']:
+                break
+            cursor = result['payload']['last_cursor']
+            result = Author.get_many(first = 1, after = cursor, order_by = ['-first_name'])
+
+        self.assertEqual(names, ['Stephen', 'Akira', 'Agatha'])
+
+        cursor = result['payload']['last_cursor']
+        result = Author.get_many(last = 2, before = cursor, order_by = ['-first_name'])
+        self.assertEqual([ n['first_name'] for n in result['payload']['nodes'] ], ['Stephen', 'Akira'])
+        self.assertEqual(result['payload']['has_prev_page'], False)
+        self.assertEqual(result['payload']['has_next_page'], False)
+
+    def test_get_many_rejects_cursors_from_other_orderings(self):
+        cursor = Author.get_many(first = 1, order_by = ['last_name'])['payload']['last_cursor']
+        result = Author.get_many(first = 1, after = cursor)
+        self.assertIsNone(result['payload'])
+        self.assertEqual(result['errors'], [PAGINATION_CURSOR_INVALID])
+
+    def test_get_many_rejects_tampered_cursors_without_querying(self):
+        cursor = Author.get_many(first = 1)['payload']['last_cursor']
+        tampered = ('B' if cursor[2] == 'A' else 'A').join([cursor[:2], cursor[3:]])
+
+        with self.assertNumQueries(0):
+            result = Author.get_many(first = 1, after = tampered)
+
+        self.assertIsNone(result['payload'])
+        self.assertEqual(result['errors'], [PAGINATION_CURSOR_INVALID])
+
+    def test_get_many_wont_order_by_hidden_fields(self):
+        old_serializer = Author.Serializer
+        Author.Serializer = type('Serializer', (), { 'hidden_fields': ['last_name'] })
+        result = Author.get_many(order_by = ['last_name'])
+        exported = Author.export_many(order_by = ['-last_name'])
+        Author.Serializer = old_serializer
+
+        self.assertIsNone(result['payload'])
+        self.assertEqual(result['errors'][0]['unique_name'], 'INVALID_ORDER_BY_PARAMETER')
+        self.assertIsNone(exported['payload'])
+        self.assertEqual(exported['errors'], [INVALID_ORDER_BY_PARAMETER('-last_name')])
+
     def test_get_many_can_utilize_custom_default_page_size(self):
         old_default_page_size = Author.Pagination.default_page_size
         Author.Pagination.default_page_size = 2
@@ -92,6 +211,33 @@ class TestModelMethods(TestCase):
             self.assertIsInstance(node['cursor'], str)
             self.assertEqual(len(node), 6)
 
+    def test_get_many_can_apply_total_count_field(self):
+        result = Author.get_many(first = 1, pseudo_fields=['total_count'])
+        self.assertEqual(result['payload']['total_count'], 3)
+        self.assertEqual(result['payload']['total_count_mode'], 'exact')
+
+        result = Author.get_many(first = 1)
+        self.assertNotIn('total_count', result['payload'])
+
+    def test_get_many_can_cache_total_count(self):
+        filters = { 'last_name__startswith': 'T' }
+        result = Author.get_many(filters = filters, pseudo_fields=['total_count'], total_count_mode='cached')
+        self.assertEqual(result['payload']['total_count'], 1)
+        self.assertEqual(result['payload']['total_count_mode'], 'cached')
+
+        Author.objects.create(first_name="JRR", last_name="Tolkein")
+        result = Author.get_many(filters = filters, pseudo_fields=['total_count'], total_count_mode='cached')
+        self.assertEqual(result['payload']['total_count'], 1)
+
+    def test_get_many_reports_the_total_count_mode_used(self):
+        result = Author.get_many(pseudo_fields=['total_count'], total_count_mode='estimated')
+        self.assertEqual(result['payload']['total_count'], 3)
+        self.assertEqual(result['payload']['total_count_mode'], 'exact')
+
+        result = Author.get_many(pseudo_fields=['total_count'], total_count_mode='approximately')
+        self.assertIsNone(result['payload'])
+        self.assertEqual(result['errors'][0]['unique_name'], 'INVALID_TOTAL_COUNT_MODE')
+
     def test_get_many_input_can_be_modified_by_hooks(self):
         def force_first_name_equals_agatha(**input):
             input['filters']['first_name'] = 'Agatha'
@@ -141,6 +287,24 @@ class TestModelMethods(TestCase):
         for node in result['payload']['nodes']:
             self.assertEqual(len(node['last_name']), 2)
 
+    def test_export_many_applies_hooks_to_every_chunk(self):
+        def abbreviate_last_names(**output):
+            for node in output['payload']['nodes']:
+                node['last_name'] = node['last_name'][0] + '.'
+            return output
+
+        old_chunk_size = Author.Pagination.stream_chunk_size
+        Author.Pagination.stream_chunk_size = 2
+        Author.Hooks.after_get_many.append(abbreviate_last_names)
+        result = Author.export_many(filters = {})
+        nodes = list(result['payload']['nodes'])
+        Author.Hooks.after_get_many.clear()
+        Author.Pagination.stream_chunk_size = old_chunk_size
+
+        self.assertEqual(len(nodes), 3)
+        for node in nodes:
+            self.assertEqual(len(node['last_name']), 2)
+
     def test_create_one_returns_a_newly_created_object(self):
         result = Author.create_one(first_name = "JRR", last_name = "Tolkein")
         self.assertIsNotNone(result['payload']['id'])
@@ -177,6 +341,270 @@ class TestModelMethods(TestCase):
         self.assertEqual(result['payload']['last_name'], 'Truman')
 
 
+    def test_create_many_stores_every_object_at_once(self):
+        author_ids = list(Author.objects.values_list('id', flat=True))
+        objects = [ { "title": f"Book {i}", "author": author_ids[i % 3] } for i in range(10) ]
+
+        with CaptureQueriesContext(connection) as context:
+            result = Book.create_many(objects = objects)
+
+        # Looking up every author at once, and inserting every book at once
+        statements = [ q['sql'].split(' ')[0] for q in context.captured_queries ]
+        self.assertEqual(statements.count('SELECT'), 1)
+        self.assertEqual(statements.count('INSERT'), 1)
+
+        self.assertEqual(result['errors'], [])
+        self.assertEqual(len(result['payload']), 10)
+        self.assertEqual(result['payload'][4]['author_id'], author_ids[1])
+        self.assertEqual(Book.objects.filter(title__startswith="Book ").count(), 10)
+
+    def test_create_many_reports_errors_per_object(self):
+        result = Book.create_many(objects = [
+            { "title": "Carrie", "author": Author.objects.first().id },
+            { "title": "Misery", "author": 999 },
+            { "author": Author.objects.first().id },
+        ])
+
+        self.assertIsNone(result['payload'])
+        self.assertEqual([ e['index'] for e in result['errors'] ], [1, 2])
+        self.assertEqual(result['errors'][0]['unique_name'], 'INVALID_FIELD:author')
+        self.assertEqual(result['errors'][1]['unique_name'], 'INVALID_FIELD:title')
+        self.assertFalse(Book.objects.filter(title="Carrie").exists())
+
+    def test_create_many_reports_malformed_relations_per_object(self):
+        result = Book.create_many(objects = [
+            { "title": "Carrie", "author": Author.objects.first().id },
+            { "title": "Misery", "author": "stephen" },
+        ])
+
+        self.assertIsNone(result['payload'])
+        self.assertEqual([ e['index'] for e in result['errors'] ], [1])
+        self.assertEqual(result['errors'][0]['unique_name'], 'INVALID_FIELD:author')
+
+    def test_create_many_validates_relations_per_object(self):
+        result = Book.create_many(objects = [
+            { "title": "Carrie", "author": Author.objects.first().id },
+            { "title": "Misery" },
+            "It",
+        ])
+
+        self.assertIsNone(result['payload'])
+        self.assertEqual([ e['index'] for e in result['errors'] ], [2])
+        self.assertEqual(result['errors'][0]['unique_name'], 'INVALID_OBJECT_RECEIVED')
+
+        result = Book.create_many(objects = [
+            { "title": "Carrie", "author": Author.objects.first().id },
+            { "title": "Misery" },
+        ])
+
+        self.assertIsNone(result['payload'])
+        self.assertEqual(result['errors'], with_index(1, Book.create_one(title = "Misery")['errors']))
+        self.assertFalse(Book.objects.filter(title="Carrie").exists())
+
+    def test_create_many_applies_create_one_hooks_to_every_object(self):
+        def capitalize_first_name(**input):
+            input['first_name'] = input['first_name'].capitalize()
+            return (input, None)
+
+        Author.Hooks.before_create_one.append(capitalize_first_name)
+        result = Author.create_many(objects = [
+            { "first_name": "ursula", "last_name": "Le Guin" },
+            { "first_name": "octavia", "last_name": "Butler" },
+        ])
+        Author.Hooks.before_create_one.clear()
+
+        self.assertEqual([ a['first_name'] for a in result['payload'] ], ['Ursula', 'Octavia'])
+
+    def test_delete_one_can_use_a_single_statement(self):
+        location = InventoryLocation.objects.create(street_address="1 Main St", state_or_province="ME", country="US")
+        employee = Employee.objects.create(location=location, first_name="Annie", last_name="Wilkes")
+
+        class Deletion:
+            returning = True
+            db_cascade = False
+
+        Employee.Deletion = Deletion
+        with CaptureQueriesContext(connection) as context:
+            result = Employee.delete_one(id = employee.id)
+        missing = Employee.delete_one(id = employee.id)
+        del Employee.Deletion
+
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertTrue(context.captured_queries[0]['sql'].startswith('DELETE'))
+
+        self.assertEqual(result['errors'], [])
+        self.assertEqual(result['payload'], employee.to_dict())
+        self.assertFalse(Employee.objects.filter(id=employee.id).exists())
+        self.assertEqual(missing['errors'], [OBJECT_WITH_ID_DOES_NOT_EXIST(employee.id)])
+
+    def test_delete_returning_is_only_used_by_databases_that_accept_it(self):
+        oracle = SimpleNamespace(vendor = 'oracle')
+        mysql = SimpleNamespace(vendor = 'mysql', mysql_is_mariadb = False, mysql_version = (8, 0, 30))
+        mariadb = SimpleNamespace(vendor = 'mysql', mysql_is_mariadb = True, mysql_version = (10, 5, 0))
+
+        self.assertFalse(supports_delete_returning(oracle))
+        self.assertFalse(supports_delete_returning(mysql))
+        self.assertTrue(supports_delete_returning(mariadb))
+        self.assertTrue(supports_delete_returning(connection))
+
+    def test_delete_one_uses_the_collector_for_models_with_dependents(self):
+        author = Author.objects.get(last_name="King")
+
+        class Deletion:
+            returning = True
+            db_cascade = False
+
+        Author.Deletion = Deletion
+        result = Author.delete_one(id = author.id)
+        del Author.Deletion
+
+        self.assertEqual(result['payload']['last_name'], "King")
+        self.assertFalse(Book.objects.filter(title="The Shining").exists())
+
+    def test_update_one_writes_only_the_given_fields(self):
+        book = Book.objects.get(title="Dragon Ball")
+        author = Author.objects.get(last_name="King")
+
+        with CaptureQueriesContext(connection) as context:
+            result = Book.update_one(id = book.id, author = author.id)
+
+        # Reading the book, checking the author exists, and writing the book
+        self.assertEqual(len(context.captured_queries), 3)
+        update = context.captured_queries[-1]['sql']
+        self.assertTrue(update.startswith('UPDATE'))
+        self.assertNotIn('"title"', update)
+
+        self.assertEqual(result['errors'], [])
+        self.assertEqual(result['payload']['author_id'], author.id)
+        self.assertEqual(result['payload']['title'], "Dragon Ball")
+        self.assertEqual(Book.objects.get(id=book.id).author_id, author.id)
+
+    def test_update_one_rejects_reverse_relations(self):
+        author = Author.objects.get(last_name="King")
+        result = Author.update_one(id = author.id, book = 1)
+
+        self.assertIsNone(result['payload'])
+        self.assertEqual(result['errors'], [{ "message": "type object 'Author' has no attribute 'book'" }])
+
+    def test_update_one_validates_the_given_fields(self):
+        book = Book.objects.get(title="Dragon Ball")
+
+        result = Book.update_one(id = book.id, author = 999)
+        self.assertIsNone(result['payload'])
+        self.assertEqual(result['errors'][0]['unique_name'], 'INVALID_FIELD:author')
+
+        result = Book.update_one(id = book.id, title = "")
+        self.assertEqual(result['errors'][0]['unique_name'], 'INVALID_FIELD:title')
+
+    def test_update_one_refreshes_updated_at(self):
+        author = Author.objects.get(last_name="King")
+        result = Author.update_one(id = author.id, first_name = "Steve")
+        self.assertGreater(result['payload']['updated_at'], author.updated_at.isoformat())
+        self.assertEqual(Author.objects.get(id=author.id).first_name, "Steve")
+
+    def test_update_many_uses_a_single_update(self):
+        with CaptureQueriesContext(connection) as context:
+            result = Author.update_many(
+                filters = { "first_name__startswith": "A" },
+                fields = { "last_name": "Anonymous" },
+            )
+
+        statements = [ q['sql'].split(' ')[0] for q in context.captured_queries ]
+        self.assertEqual(statements.count('UPDATE'), 1)
+        self.assertEqual(statements.count('SELECT'), 0)
+
+        self.assertEqual(result['errors'], [])
+        self.assertEqual(result['payload'], { "count": 2, "dry_run": False })
+        self.assertEqual(Author.objects.filter(last_name="Anonymous").count(), 2)
+
+    def test_update_many_validates_fields(self):
+        result = Book.update_many(filters = { "title": "Dragon Ball" }, fields = { "author": 999 })
+        self.assertIsNone(result['payload'])
+        self.assertEqual(result['errors'][0]['unique_name'], 'INVALID_FIELD:author')
+
+        result = Book.update_many(filters = { "title": "Dragon Ball" }, fields = { "isbn": "123" })
+        self.assertEqual(result['errors'][0]['unique_name'], 'INVALID_FIELD:isbn')
+
+    def test_update_many_requires_fields(self):
+        for fields in [{}, None]:
+            result = Author.update_many(filters = { "first_name__startswith": "A" }, fields = fields)
+            self.assertIsNone(result['payload'])
+            self.assertEqual(result['errors'], [BULK_UPDATE_REQUIRES_FIELDS])
+
+    def test_update_many_reads_no_more_cached_ids_than_may_be_updated(self):
+        class Caching(RestResource.Caching):
+            enabled = True
+
+        self.use_caching(Author, Caching)
+        max_affected_rows = Author.Bulk.max_affected_rows
+        Author.Bulk.max_affected_rows = 1
+        self.addCleanup(setattr, Author.Bulk, 'max_affected_rows', max_affected_rows)
+
+        with CaptureQueriesContext(connection) as context:
+            result = Author.update_many(filters = { "first_name__startswith": "A" }, fields = { "last_name": "Anonymous" })
+
+        self.assertEqual(result['errors'][0]['unique_name'], 'TOO_MANY_OBJECTS_AFFECTED')
+        selects = [ q['sql'] for q in context.captured_queries if q['sql'].startswith('SELECT') ]
+        self.assertEqual(len(selects), 1)
+        self.assertIn('LIMIT 2', selects[0])
+
+    def test_bulk_operations_require_filters(self):
+        for operation in [Author.update_many, Author.delete_many]:
+            result = operation(fields = { "last_name": "Anonymous" })
+            self.assertIsNone(result['payload'])
+            self.assertEqual(result['errors'], [BULK_OPERATION_REQUIRES_FILTERS])
+
+        self.assertEqual(Author.objects.count(), 3)
+
+    def test_bulk_operations_can_be_dry_runs(self):
+        result = Author.delete_many(filters = { "first_name__startswith": "A" }, dry_run = True)
+        counts = { "bookstore.Author": 2, "bookstore.Book": 2 }
+        self.assertEqual(result['payload'], { "count": 4, "counts": counts, "dry_run": True })
+        self.assertEqual(Author.objects.count(), 3)
+
+        result = Author.update_many(filters = { "first_name__startswith": "A" }, fields = { "last_name": "A." }, dry_run = True)
+        self.assertEqual(result['payload'], { "count": 2, "dry_run": True })
+        self.assertFalse(Author.objects.filter(last_name="A.").exists())
+
+    def test_bulk_operations_roll_back_when_too_many_rows_are_affected(self):
+        max_affected_rows = Author.Bulk.max_affected_rows
+        Author.Bulk.max_affected_rows = 1
+        result = Author.delete_many(filters = { "first_name__startswith": "A" })
+        Author.Bulk.max_affected_rows = max_affected_rows
+
+        self.assertIsNone(result['payload'])
+        self.assertEqual(result['errors'][0]['unique_name'], 'TOO_MANY_OBJECTS_AFFECTED')
+        self.assertEqual(Author.objects.count(), 3)
+
+    def test_delete_many_counts_cascaded_rows_towards_the_limit(self):
+        max_affected_rows = Author.Bulk.max_affected_rows
+        Author.Bulk.max_affected_rows = 1
+        self.addCleanup(setattr, Author.Bulk, 'max_affected_rows', max_affected_rows)
+
+        # Deleting one author would delete their book too
+        result = Author.delete_many(filters = { "last_name": "King" })
+        self.assertEqual(result['errors'][0]['unique_name'], 'TOO_MANY_OBJECTS_AFFECTED')
+        self.assertTrue(Book.objects.filter(title="The Shining").exists())
+
+    def test_delete_many_deletes_matching_objects(self):
+        result = Author.delete_many(filters = { "last_name": "King" })
+        counts = { "bookstore.Author": 1, "bookstore.Book": 1 }
+        self.assertEqual(result['payload'], { "count": 2, "counts": counts, "dry_run": False })
+        self.assertFalse(Author.objects.filter(last_name="King").exists())
+        self.assertFalse(Book.objects.filter(title="The Shining").exists())
+
+    def test_bulk_operation_hooks_receive_filters(self):
+        def restrict_to_king(**input):
+            input['filters']['last_name'] = "King"
+            return (input, None)
+
+        Author.Hooks.before_delete_many.append(restrict_to_king)
+        result = Author.delete_many(filters = { "first_name__startswith": "A" })
+        Author.Hooks.before_delete_many.clear()
+
+        self.assertEqual(result['payload']['count'], 0)
+        self.assertEqual(Author.objects.count(), 3)
+
     def test_before_anything_hook_runs_first(self):
         def make_bill(**input):
             input['first_name'] = "Bill"
@@ -219,3 +647,252 @@ class TestModelMethods(TestCase):
         self.assertEqual(0, len(Things.Hooks.before_get_many))
         self.assertEqual(0, len(Things.Hooks.after_get_many))
 
+    def test_inherited_lists_of_hooks_report_changes(self):
+        class SharedHooks(RestResource.Hooks):
+            before_get_one = []
+
+        class Readers(RestResource):
+            name = models.CharField(max_length=255)
+
+            class Hooks(SharedHooks):
+                pass
+
+        self.assertEqual(Readers.hook_chain('get_one'), ((), ()))
+
+        stop = lambda **input: (None, [{ 'message': 'Stopped' }])
+        SharedHooks.before_get_one.append(stop)
+        self.assertEqual(Readers.hook_chain('get_one'), ((stop,), ()))
+
+    def test_hook_chains_are_resolved_once(self):
+        inner_fn = lambda **input: input
+        self.assertIs(Author.with_hooks(inner_fn, 'get_one'), inner_fn)
+        self.assertIs(Author.hook_chain('get_one'), Author.hook_chain('get_one'))
+
+        def stop(**input):
+            return (None, [{ 'message': 'Stopped' }])
+
+        # Changing a list of hooks is noticed
+        Author.Hooks.before_get_one.append(stop)
+        result = Author.get_one(id = 1)
+        Author.Hooks.before_get_one.clear()
+
+        self.assertEqual(result['errors'], [{ 'message': 'Stopped' }])
+        self.assertEqual(Author.hook_chain('get_one'), ((), ()))
+
+        # Replacing `Hooks` is noticed too
+        hooks = Author.Hooks
+        Author.Hooks = type('Hooks', (), { 'before_get_one': [stop] })
+        result = Author.get_one(id = 1)
+        Author.Hooks = hooks
+
+        self.assertEqual(result['errors'], [{ 'message': 'Stopped' }])
+        self.assertIsNotNone(Author.get_one(id = 1)['payload'])
+
+    def test_operations_are_measured(self):
+        sink = instrumentation.MemorySink()
+        instrumentation.configure(enabled = True, sink = sink)
+        Book.get_many(first = 2)
+        Book.get_one(id = 1)
+        instrumentation.configure(enabled = False, sink = instrumentation.MemorySink())
+
+        stats = sink.operations[('bookstore.Book', 'get_many')]
+        self.assertEqual(stats['seconds'].count, 1)
+        self.assertEqual(stats['queries'].sum, 1)
+        self.assertEqual(stats['rows'], 2)
+        self.assertIn('pagination', stats['phases'])
+        self.assertIn('serialization', stats['phases'])
+        self.assertEqual(sink.operations[('bookstore.Book', 'get_one')]['rows'], 1)
+
+    def test_get_one_reads_through_the_cache(self):
+        class Caching(RestResource.Caching):
+            enabled = True
+
+        self.use_caching(Author, Caching)
+        author = Author.objects.get(last_name="King")
+        Author.get_one(id = author.id)
+
+        with self.assertNumQueries(0):
+            result = Author.get_one(id = author.id)
+        self.assertEqual(result['payload']['first_name'], "Stephen")
+
+        # Forgetting payloads of instances changed by the library
+        Author.update_one(id = author.id, first_name = "Steve")
+        self.assertEqual(Author.get_one(id = author.id)['payload']['first_name'], "Steve")
+
+        Author.update_many(filters = { "last_name": "King" }, fields = { "first_name": "Richard" })
+        self.assertEqual(Author.get_one(id = author.id)['payload']['first_name'], "Richard")
+
+        # Forgetting payloads of instances changed elsewhere
+        author.first_name = "Stephen"
+        author.save()
+        self.assertEqual(Author.get_one(id = author.id)['payload']['first_name'], "Stephen")
+
+        author.delete()
+        result = Author.get_one(id = author.id)
+
+        self.assertIsNone(result['payload'])
+
+    def test_instances_are_cached_under_normalized_ids(self):
+        id = uuid.uuid4()
+        model = SimpleNamespace(_meta = SimpleNamespace(label = 'bookstore.Shelf', pk = models.UUIDField()))
+
+        # Reading and invalidating with ids in other forms use the same key
+        self.assertEqual(caching.instance_key(model, str(id).upper()), caching.instance_key(model, id))
+        self.assertEqual(caching.instance_key(model, id.hex), caching.instance_key(model, id))
+        self.assertEqual(caching.instance_key(Author, '7'), caching.instance_key(Author, 7))
+
+    def test_get_many_pages_are_cached_until_the_next_write(self):
+        class Caching(RestResource.Caching):
+            enabled = True
+            pages = True
+
+        self.use_caching(Author, Caching)
+        sink = instrumentation.MemorySink()
+        instrumentation.configure(enabled = True, sink = sink)
+
+        first_page = Author.get_many(first = 2, order_by = ["first_name"])
+        with self.assertNumQueries(0):
+            cached_page = Author.get_many(first = 2, order_by = ["first_name"])
+        self.assertEqual(cached_page, first_page)
+
+        # Writes start a new generation of pages
+        Author.create_many(objects = [{ "first_name": "Aaron", "last_name": "Elkins" }])
+        result = Author.get_many(first = 2, order_by = ["first_name"])
+        self.assertEqual(result['payload']['nodes'][0]['first_name'], "Aaron")
+
+        Author.create_one(first_name = "Aardvark", last_name = "Jones")
+        result = Author.get_many(first = 2, order_by = ["first_name"])
+        self.assertEqual(result['payload']['nodes'][0]['first_name'], "Aardvark")
+
+        instrumentation.configure(enabled = False, sink = instrumentation.MemorySink())
+
+        stats = sink.operations[('bookstore.Author', 'get_many')]
+        self.assertEqual(stats['cache_hits'], 1)
+        self.assertEqual(stats['cache_misses'], 3)
+
+    def test_local_caches_expire_and_evict_entries(self):
+        cache = caching.LocalCache(max_entries = 2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual([cache.get('a'), cache.get('b'), cache.get('c')], [1, None, 3])
+
+        cache.set('d', 4, timeout = 0)
+        self.assertIsNone(cache.get('d'))
+
+    def test_identical_concurrent_reads_share_one_execution(self):
+        class Caching(RestResource.Caching):
+            coalesce = True
+
+        self.use_caching(Author, Caching)
+        author = Author.objects.get(last_name="King")
+        flight_key = caching.flight_key(Author, 'get_one', { 'id': author.id })
+        results = []
+        threads = []
+
+        def read():
+            try:
+                results.append(Author.get_one(id = author.id))
+            finally:
+                connection.close()
+
+        def slow_read():
+            # Reading in another thread, while this read is in flight
+            threads.append(threading.Thread(target = read))
+            threads[0].start()
+            time.sleep(0.05)
+            return { 'payload': { 'first_name': "Shared" }, 'errors': [] }
+
+        leader = caching.share(flight_key, slow_read)
+        threads[0].join()
+
+        # Calls made after the flight landed start afresh
+        result = Author.get_one(id = author.id)
+
+        self.assertEqual(results, [leader])
+        self.assertIsNot(results[0]['payload'], leader['payload'])
+        self.assertEqual(result['payload']['first_name'], "Stephen")
+
+    def test_identical_concurrent_coroutines_share_one_execution(self):
+        calls = []
+
+        async def read():
+            calls.append(1)
+            await asyncio.sleep(0)
+            return { 'payload': { 'nodes': [{ 'id': 1 }] }, 'errors': [] }
+
+        async def read_concurrently():
+            return await asyncio.gather(*[ caching.ashare('key', read) for _ in range(3) ])
+
+        results = asyncio.run(read_concurrently())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results[0], results[2])
+        self.assertIsNot(results[1]['payload']['nodes'][0], results[2]['payload']['nodes'][0])
+
+    def test_writes_forget_reads_in_flight(self):
+        class Caching(RestResource.Caching):
+            coalesce = True
+
+        self.use_caching(Author, Caching)
+        flight_key = caching.flight_key(Author, 'get_many', { 'first': 2 })
+
+        def read():
+            in_flight = flight_key in caching._flights
+            Author.create_one(first_name = "Aaron", last_name = "Elkins")
+            return { 'payload': None, 'errors': [], 'in_flight': [in_flight, flight_key in caching._flights] }
+
+        result = caching.share(flight_key, read)
+
+        self.assertEqual(result['in_flight'], [True, False])
+
+    def test_async_operations_await_async_hooks(self):
+        async def only_agatha(**input):
+            return { **input, 'filters': { 'first_name': "Agatha" } }, []
+
+        def shout_first_names(**output):
+            for node in output['payload']['nodes']:
+                node['first_name'] = node['first_name'].upper()
+            return output
+
+        Author.Hooks.before_get_many.append(only_agatha)
+        Author.Hooks.after_get_many.append(shout_first_names)
+        result = async_to_sync(Author.aget_many)()
+        sync_result = Author.get_many()
+        Author.Hooks.before_get_many.clear()
+        Author.Hooks.after_get_many.clear()
+
+        # Async hooks are run to completion by synchronous operations too
+        self.assertEqual(result, sync_result)
+        self.assertEqual([ node['first_name'] for node in result['payload']['nodes'] ], ["AGATHA"])
+
+    def test_async_operations_match_synchronous_operations(self):
+        created = async_to_sync(Author.acreate_one)(first_name = "Aaron", last_name = "Elkins")
+        author_id = created['payload']['id']
+        self.assertEqual(async_to_sync(Author.aget_one)(id = author_id), Author.get_one(id = author_id))
+
+        updated = async_to_sync(Author.aupdate_one)(id = author_id, first_name = "Ed")
+        self.assertEqual(updated['payload']['first_name'], "Ed")
+
+        result = async_to_sync(Author.adelete_many)(filters = { "last_name": "Elkins" })
+        self.assertEqual(result['payload']['count'], 1)
+
+    def test_async_operations_are_measured_with_their_queries(self):
+        sink = instrumentation.MemorySink()
+        instrumentation.configure(enabled = True, sink = sink)
+        async_to_sync(Author.aget_one)(id = 1)
+        instrumentation.configure(enabled = False, sink = instrumentation.MemorySink())
+
+        stats = sink.operations[('bookstore.Author', 'get_one')]
+        self.assertEqual(stats['seconds'].count, 1)
+        self.assertEqual(stats['queries'].sum, 1)
+
+    def test_to_dict_does_not_fetch_related_objects(self):
+        book = Book.objects.get(title="Dragon Ball")
+
+        with self.assertNumQueries(0):
+            result = book.to_dict()
+
+        self.assertEqual(result['author_id'], book.author_id)
+        self.assertNotIn('author', result)
+        self.assertIsInstance(result['created_at'], str)
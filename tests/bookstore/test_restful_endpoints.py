@@ -1,7 +1,11 @@
 
 from json import loads as deserialize
 from django_instant_rest import patterns
-from django.test import TestCase, Client
+from django_instant_rest.casing import camel_keys
+from django_instant_rest import instrumentation, caching
+from django.test import TestCase, Client, AsyncClient, RequestFactory
+from asgiref.sync import async_to_sync
+from django_instant_rest.models import RestResource
 from .models import Author, Book, Customer
 
 
@@ -18,6 +22,23 @@ class TestResourceModel(TestCase):
         the_secret_adversary = Book.objects.create(title="The Secret Adversary", author=agatha)
         dragon_ball = Book.objects.create(title="Dragon Ball", author=akira)
 
+    def use_caching(self, model, config):
+        '''Configure a model's caching for one test, leaving nothing cached, in flight, or connected'''
+        original = vars(model).get('Caching')
+        model.Caching = config
+
+        # Connecting the model, as defining it with `Caching` would
+        caching.connect(model)
+
+        def restore():
+            caching.disconnect(model)
+            if original is None:
+                del model.Caching
+            else:
+                model.Caching = original
+
+        self.addCleanup(restore)
+
     def test_get_requests_return_200(self):
         response = self.client.get('/authors')
         self.assertEqual(response.status_code, 200)
@@ -227,3 +248,297 @@ class TestResourceModel(TestCase):
         self.assertEqual(response.status_code, 200)
         body = deserialize(response.content)
         self.assertEqual(len(body['errors']), 1)
+
+    def test_streamed_get_requests_match_buffered_get_requests(self):
+        old_chunk_size = Author.Pagination.stream_chunk_size
+        Author.Pagination.stream_chunk_size = 2
+
+        for query in ['', '?first=2', '?last=2', '?order_by=-first_name&first=1']:
+            buffered = deserialize(self.client.get('/authors' + query).content)
+            response = self.client.get('/streamed-authors' + query)
+            streamed = deserialize(b''.join(response.streaming_content))
+            self.assertEqual(streamed, buffered)
+
+        Author.Pagination.stream_chunk_size = old_chunk_size
+
+    def test_streamed_get_requests_respect_forward_pagination(self):
+        response = self.client.get('/streamed-authors?first=2')
+        body = deserialize(b''.join(response.streaming_content))
+        self.assertEqual(len(body['payload']['nodes']), 2)
+        self.assertEqual(body['payload']['has_next_page'], True)
+
+        cursor = body['payload']['last_cursor']
+        response = self.client.get('/streamed-authors?first=2&after=' + cursor)
+        body = deserialize(b''.join(response.streaming_content))
+        self.assertEqual(len(body['payload']['nodes']), 1)
+        self.assertEqual(body['payload']['nodes'][0]['first_name'], 'Akira')
+        self.assertEqual(body['payload']['has_next_page'], False)
+        self.assertEqual(body['payload']['has_prev_page'], True)
+
+    def test_streamed_get_requests_match_buffered_backward_pages(self):
+        cursor = deserialize(self.client.get('/authors?last=1').content)['payload']['first_cursor']
+        query = f'?last=1&before={cursor}&probe_opposite_page=false'
+
+        buffered = deserialize(self.client.get('/authors' + query).content)
+        streamed = deserialize(b''.join(self.client.get('/streamed-authors' + query).streaming_content))
+
+        # Leaving `has_next_page` unknown, rather than claiming there's none
+        self.assertIsNone(buffered['payload']['has_next_page'])
+        self.assertEqual(streamed, buffered)
+
+    def test_streamed_get_requests_return_errors(self):
+        response = self.client.get('/streamed-authors?first=1&after=nonsense')
+        body = deserialize(b''.join(response.streaming_content))
+        self.assertIsNone(body['payload'])
+        self.assertEqual(body['errors'][0]['unique_name'], 'PAGINATION_CURSOR_INVALID')
+
+    def test_export_requests_return_every_matching_object_as_ndjson(self):
+        response = self.client.get('/authors/export?first_name__startswith=A')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        lines = b''.join(response.streaming_content).decode('utf8').splitlines()
+        authors = [ deserialize(line) for line in lines ]
+        self.assertEqual(sorted(a['first_name'] for a in authors), ['Agatha', 'Akira'])
+        self.assertIsInstance(authors[0]['created_at'], str)
+
+    def test_export_requests_strip_hidden_fields(self):
+        old_serializer = Author.Serializer
+        Author.Serializer = type('Serializer', (), { 'hidden_fields': ['last_name'] })
+        response = self.client.get('/authors/export')
+        lines = b''.join(response.streaming_content).decode('utf8').splitlines()
+        Author.Serializer = old_serializer
+
+        self.assertEqual(len(lines), 3)
+        for line in lines:
+            self.assertNotIn('last_name', deserialize(line))
+
+    def test_export_requests_are_only_routed_when_enabled(self):
+        response = self.client.get('/books/export')
+        body = deserialize(response.content)
+        self.assertIsNone(body['payload'])
+
+    def test_post_requests_with_arrays_create_many_instances(self):
+        response = self.client.post(
+            '/authors',
+            content_type = "application/json",
+            data = [
+                { "first_name": "Tom", "last_name": "Clancy" },
+                { "first_name": "Ray", "last_name": "Bradbury" },
+            ],
+        )
+
+        body = deserialize(response.content)
+        self.assertEqual(body['errors'], [])
+        self.assertEqual([ a['last_name'] for a in body['payload'] ], ['Clancy', 'Bradbury'])
+        self.assertTrue(Author.objects.filter(last_name="Bradbury").exists())
+
+    def test_put_requests_without_an_id_update_matching_instances(self):
+        response = self.client.put(
+            '/authors?first_name__startswith=A',
+            content_type = "application/json",
+            data = { "last_name": "Anonymous" },
+        )
+
+        body = deserialize(response.content)
+        self.assertEqual(body['errors'], [])
+        self.assertEqual(body['payload']['count'], 2)
+        self.assertEqual(Author.objects.filter(last_name="Anonymous").count(), 2)
+
+    def test_delete_requests_without_an_id_delete_matching_instances(self):
+        response = self.client.delete('/authors?first_name__startswith=A&dry_run=true')
+        body = deserialize(response.content)
+        self.assertEqual(body['payload']['count'], 4)
+        self.assertEqual(body['payload']['counts'], { "bookstore.Author": 2, "bookstore.Book": 2 })
+        self.assertTrue(body['payload']['dry_run'])
+        self.assertEqual(Author.objects.count(), 3)
+
+        response = self.client.delete('/authors?first_name__startswith=A')
+        body = deserialize(response.content)
+        self.assertEqual(body['payload']['count'], 4)
+        self.assertEqual(body['payload']['counts'], { "bookstore.Author": 2, "bookstore.Book": 2 })
+        self.assertFalse(body['payload']['dry_run'])
+        self.assertEqual(Author.objects.count(), 1)
+
+    def test_delete_requests_without_filters_delete_nothing(self):
+        response = self.client.delete('/authors')
+        body = deserialize(response.content)
+        self.assertEqual(body['errors'][0]['unique_name'], 'BULK_OPERATION_REQUIRES_FILTERS')
+        self.assertEqual(Author.objects.count(), 3)
+
+    def test_get_requests_parse_date_filters(self):
+        created_at = Author.objects.get(last_name="Christie").created_at.isoformat()
+        response = self.client.get('/authors', { 'created_at__gte': created_at })
+        body = deserialize(response.content)
+        self.assertEqual([ a['last_name'] for a in body['payload']['nodes'] ], ['Christie', 'Toriyama'])
+
+        response = self.client.get('/authors?created_at__gte=yesterday')
+        body = deserialize(response.content)
+        self.assertEqual(body['errors'][0]['unique_name'], 'INVALID_DATE_RECIEVED')
+
+    def test_get_requests_reject_unknown_and_hidden_filters(self):
+        response = self.client.get('/authors?nickname=Steve')
+        body = deserialize(response.content)
+        self.assertEqual(body['errors'][0]['unique_name'], 'INVALID_FILTER_PARAMETER')
+
+        serializer = Author.Serializer
+        Author.Serializer = type('Serializer', (), { 'hidden_fields': ['last_name'] })
+        response = self.client.get('/authors?last_name__startswith=K')
+        Author.Serializer = serializer
+
+        body = deserialize(response.content)
+        self.assertIsNone(body['payload'])
+        self.assertEqual(body['errors'][0]['unique_name'], 'INVALID_FILTER_PARAMETER')
+
+    def test_resource_middleware_is_instantiated_once(self):
+        instances = []
+
+        class CountingMiddleware:
+            def __init__(self, get_response):
+                self.get_response = get_response
+                instances.append(self)
+
+            def __call__(self, request, id = None):
+                return self.get_response(request)
+
+        route = patterns.resource('authors', Author, middleware=CountingMiddleware)
+        for id in [None, '1']:
+            request = RequestFactory().get('/authors')
+            response = route.callback(request, id = id)
+            body = deserialize(response.content)
+            self.assertEqual(body['errors'], [])
+
+        self.assertEqual(len(instances), 1)
+        self.assertEqual(body['payload']['last_name'], 'King')
+
+    def test_camel_cased_get_requests_match_snake_cased_get_requests(self):
+        snake_body = deserialize(self.client.get('/books?pseudo_fields=cursor,total_count').content)
+        camel_body = deserialize(self.client.get('/camel-books?pseudoFields=cursor,totalCount').content)
+
+        self.assertEqual(camel_body['payload'], camel_keys(snake_body['payload']))
+        self.assertIn('authorId', camel_body['payload']['nodes'][0])
+        self.assertIn('totalCount', camel_body['payload'])
+
+    def test_camel_cased_export_requests_serialize_camel_cased_keys(self):
+        response = self.client.get('/camel-books/export?authorId=1')
+        lines = [ deserialize(line) for line in b''.join(response.streaming_content).splitlines() ]
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]['authorId'], 1)
+        self.assertIn('createdAt', lines[0])
+
+    def test_metrics_requests_expose_measured_operations(self):
+        instrumentation.sink.clear()
+        instrumentation.configure(enabled = True)
+        self.client.get('/authors')
+        b''.join(self.client.get('/authors/export').streaming_content)
+        instrumentation.configure(enabled = False)
+
+        response = self.client.get('/metrics')
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+        text = response.content.decode()
+        self.assertIn('instant_rest_operation_seconds_count{model="bookstore.Author",operation="get_many"} 1', text)
+        self.assertIn('instant_rest_rows_total{model="bookstore.Author",operation="get_many"} 3', text)
+        self.assertIn('instant_rest_rows_total{model="bookstore.Author",operation="export_many"} 3', text)
+        self.assertIn('phase="query"', text)
+        self.assertNotIn('instant_rest_response_bytes_total{model="bookstore.Author",operation="get_many"} 0', text)
+
+    def test_get_by_id_requests_answer_conditional_requests(self):
+        response = self.client.get('/authors/1')
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertIn('Last-Modified', response)
+
+        # Checking the object's `updated_at`, without reading it
+        with self.assertNumQueries(1):
+            response = self.client.get('/authors/1', HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get('/authors/1', HTTP_IF_MODIFIED_SINCE = response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        Author.update_one(id = 1, first_name = "Richard")
+        response = self.client.get('/authors/1', HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(deserialize(response.content)['payload']['first_name'], "Richard")
+
+    def test_get_requests_answer_conditional_requests_when_enabled(self):
+        self.assertNotIn('ETag', self.client.get('/authors'))
+
+        class Caching(RestResource.Caching):
+            conditional_lists = True
+
+        self.use_caching(Author, Caching)
+        response = self.client.get('/authors?first=2')
+        etag = response['ETag']
+
+        # Checking the latest `updated_at` and count, without reading the page
+        with self.assertNumQueries(1):
+            response = self.client.get('/authors?first=2', HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Pages with other parameters are other representations
+        response = self.client.get('/authors?first=1', HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(response.status_code, 200)
+
+        # Deleting a row changes the count, though not the latest `updated_at`
+        Book.objects.filter(author__last_name = "King").delete()
+        Author.objects.filter(last_name = "King").delete()
+        response = self.client.get('/authors?first=2', HTTP_IF_NONE_MATCH = etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(deserialize(response.content)['payload']['nodes']), 2)
+
+    def test_async_routes_match_synchronous_routes(self):
+        for path in ['/authors?order_by=first_name', '/authors/1']:
+            sync_body = deserialize(self.client.get(path).content)
+            async_body = deserialize(self.client.get('/async-' + path[1:]).content)
+            self.assertEqual(async_body, sync_body)
+
+        response = self.client.post('/async-authors', content_type = "application/json", data = {
+            "first_name": "Aaron",
+            "last_name": "Elkins",
+        })
+        author_id = deserialize(response.content)['payload']['id']
+
+        response = self.client.put(f'/async-authors/{author_id}', content_type = "application/json", data = {
+            "first_name": "Ed",
+        })
+        self.assertEqual(deserialize(response.content)['payload']['first_name'], "Ed")
+
+        response = self.client.delete(f'/async-authors/{author_id}')
+        self.assertEqual(deserialize(response.content)['errors'], [])
+        self.assertFalse(Author.objects.filter(id = author_id).exists())
+
+    def test_async_resource_middleware_is_called_with_ids(self):
+        calls = []
+
+        class RecordingMiddleware:
+            def __init__(self, get_response):
+                self.get_response = get_response
+
+            def __call__(self, request, id = None):
+                calls.append(id)
+                return self.get_response(request, id = id)
+
+        pattern = patterns.resource('authors', Author, middleware = RecordingMiddleware, is_async = True)
+        request = RequestFactory().get('/authors/1')
+        response = async_to_sync(pattern.callback)(request, id = '1')
+
+        self.assertEqual(calls, ['1'])
+        self.assertEqual(deserialize(response.content)['payload']['first_name'], "Stephen")
+
+    async def test_async_streamed_and_exported_responses_are_read_completely(self):
+        client = AsyncClient()
+
+        response = await client.get('/async-streamed-authors?first=2&order_by=first_name')
+        body = deserialize(b''.join(response.streaming_content))
+        self.assertEqual(body['errors'], [])
+        self.assertEqual([ node['first_name'] for node in body['payload']['nodes'] ], ["Agatha", "Akira"])
+
+        response = await client.get('/async-streamed-authors/export')
+        lines = [ deserialize(line) for line in b''.join(response.streaming_content).splitlines() ]
+        self.assertEqual(len(lines), 3)
+        self.assertIn('first_name', lines[0])
@@ -0,0 +1,85 @@
+# Generated by Django 4.0.2 on 2026-10-18 15:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecommerce', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='admin',
+            name='ecommerce_a_created_cd1dda_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='navigationitem',
+            name='ecommerce_n_created_1576de_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='ecommerce_p_created_281ad5_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='productimage',
+            name='ecommerce_p_created_b2722b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='productmeta',
+            name='ecommerce_p_created_3370df_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='storeadmin',
+            name='ecommerce_s_created_bcfc4d_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='variantdimension',
+            name='ecommerce_v_created_7543e9_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='variantimage',
+            name='ecommerce_v_created_a7ea16_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='variantmeta',
+            name='ecommerce_v_created_d00feb_idx',
+        ),
+        migrations.AddIndex(
+            model_name='admin',
+            index=models.Index(fields=['created_at', 'id'], name='ecommerce_a_created_7b48f1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='navigationitem',
+            index=models.Index(fields=['created_at', 'id'], name='ecommerce_n_created_09db36_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['created_at', 'id'], name='ecommerce_p_created_e1b88d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productimage',
+            index=models.Index(fields=['created_at', 'id'], name='ecommerce_p_created_d8e742_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productmeta',
+            index=models.Index(fields=['created_at', 'id'], name='ecommerce_p_created_f1ec36_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storeadmin',
+            index=models.Index(fields=['created_at', 'id'], name='ecommerce_s_created_14ffa4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='variantdimension',
+            index=models.Index(fields=['created_at', 'id'], name='ecommerce_v_created_5bfee8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='variantimage',
+            index=models.Index(fields=['created_at', 'id'], name='ecommerce_v_created_93af8d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='variantmeta',
+            index=models.Index(fields=['created_at', 'id'], name='ecommerce_v_created_e51404_idx'),
+        ),
+    ]
@@ -1,2 +1,130 @@
-from django.test import TestCase
+from json import loads as deserialize
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from .models import Product, Variant
 
+
+class TestUpsertMany(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client = Client()
+        cls.shirt = Product.objects.create(name="Shirt", slug="shirt")
+        cls.variant = Variant.objects.create(name="Small", slug="small", price_in_cents_usd=1000, product=cls.shirt)
+
+    def test_upsert_many_creates_and_updates_objects(self):
+        result = Product.upsert_many(unique_fields = ["slug"], objects = [
+            { "name": "T-Shirt", "slug": "shirt" },
+            { "name": "Hat", "slug": "hat" },
+        ])
+
+        self.assertEqual(result['errors'], [])
+        self.assertEqual([ p['name'] for p in result['payload'] ], ["T-Shirt", "Hat"])
+
+        # Updated objects keep their id and creation date
+        shirt = Product.objects.get(slug="shirt")
+        self.assertEqual(shirt.name, "T-Shirt")
+        self.assertEqual(result['payload'][0]['id'], self.shirt.id)
+        self.assertEqual(result['payload'][0]['created_at'], self.shirt.created_at.isoformat())
+        self.assertGreater(shirt.updated_at, self.shirt.updated_at)
+
+        self.assertEqual(result['payload'][1]['id'], Product.objects.get(slug="hat").id)
+        self.assertEqual(Product.objects.count(), 2)
+
+    def test_upsert_many_matches_on_sets_of_unique_fields(self):
+        objects = [
+            { "name": "Small", "slug": "small", "price_in_cents_usd": 1200, "product": self.shirt.id },
+            { "name": "Large", "slug": "large", "price_in_cents_usd": 1500, "product": self.shirt.id },
+        ]
+
+        with CaptureQueriesContext(connection) as context:
+            result = Variant.upsert_many(unique_fields = ["slug", "product"], objects = objects)
+
+        # Looking up products, stored variants, and each other set of
+        # unique fields (slug, and name with product) once per batch,
+        # rather than once per object
+        statements = [ q['sql'].split(' ')[0] for q in context.captured_queries ]
+        self.assertEqual(statements.count('SELECT'), 4)
+
+        self.assertEqual(result['errors'], [])
+        self.assertEqual(result['payload'][0]['id'], self.variant.id)
+        self.assertEqual(Variant.objects.get(slug="small").price_in_cents_usd, 1200)
+        self.assertEqual(Variant.objects.count(), 2)
+
+    def test_upsert_many_requires_unique_fields(self):
+        result = Product.upsert_many(unique_fields = ["name"], objects = [{ "name": "Hat", "slug": "hat" }])
+        self.assertIsNone(result['payload'])
+        self.assertEqual(result['errors'][0]['unique_name'], 'INVALID_UNIQUE_FIELDS')
+
+    def test_upsert_many_rejects_duplicate_keys(self):
+        result = Product.upsert_many(unique_fields = ["slug"], objects = [
+            { "name": "Hat", "slug": "hat" },
+            { "name": "Cap", "slug": "hat" },
+        ])
+
+        self.assertIsNone(result['payload'])
+        self.assertEqual(result['errors'][0]['unique_name'], 'DUPLICATE_UNIQUE_FIELDS')
+        self.assertEqual(result['errors'][0]['index'], 1)
+        self.assertFalse(Product.objects.filter(slug="hat").exists())
+
+    def test_upsert_many_checks_other_unique_fields(self):
+        other = Product.objects.create(name="Hat", slug="hat")
+        result = Variant.upsert_many(unique_fields = ["slug", "product"], objects = [
+            { "name": "Large", "slug": "large", "price_in_cents_usd": 1500, "product": self.shirt.id },
+            { "name": "Small", "slug": "small", "price_in_cents_usd": 1200, "product": other.id },
+        ])
+
+        # The second object would share the stored variant's
+        # slug under another product, rather than update it
+        self.assertIsNone(result['payload'])
+        self.assertEqual([ e['index'] for e in result['errors'] ], [1])
+        self.assertEqual(result['errors'][0]['unique_name'], 'INVALID_FIELD:slug')
+
+    def test_put_requests_with_arrays_upsert_many_instances(self):
+        response = self.client.put(
+            '/products?unique_fields=slug',
+            content_type = "application/json",
+            data = [
+                { "name": "T-Shirt", "slug": "shirt" },
+                { "name": "Hat", "slug": "hat" },
+            ],
+        )
+
+        body = deserialize(response.content)
+        self.assertEqual(body['errors'], [])
+        self.assertEqual(Product.objects.get(slug="shirt").name, "T-Shirt")
+        self.assertEqual(Product.objects.count(), 2)
+
+
+class TestCreateMany(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Product.objects.create(name="Shirt", slug="shirt")
+
+    def test_create_many_checks_unique_fields_per_object(self):
+        result = Product.create_many(objects = [
+            { "name": "Hat", "slug": "hat" },
+            { "name": "T-Shirt", "slug": "shirt" },
+            { "name": "Cap", "slug": "hat" },
+        ])
+
+        self.assertIsNone(result['payload'])
+        self.assertEqual([ e['index'] for e in result['errors'] ], [1, 2])
+        self.assertEqual(result['errors'][0]['unique_name'], 'INVALID_FIELD:slug')
+        self.assertEqual(result['errors'][1]['unique_name'], 'DUPLICATE_UNIQUE_FIELDS')
+        self.assertFalse(Product.objects.filter(slug="hat").exists())
+
+    def test_create_many_reports_the_same_unique_errors_as_create_one(self):
+        result = Product.create_many(objects = [{ "name": "T-Shirt", "slug": "shirt" }])
+        self.assertEqual(result['errors'], [{ **error, "index": 0 } for error in Product.create_one(name = "T-Shirt", slug = "shirt")['errors']])
+
+
+class TestUpdateMany(TestCase):
+    def test_update_many_reports_integrity_violations(self):
+        Product.objects.create(name="Shirt", slug="shirt")
+        Product.objects.create(name="Hat", slug="hat")
+
+        result = Product.update_many(filters = { "slug__in": ["shirt", "hat"] }, fields = { "slug": "clothing" })
+        self.assertIsNone(result['payload'])
+        self.assertEqual(result['errors'][0]['unique_name'], 'DATABASE_INTEGRITY_VIOLATED')
+        self.assertFalse(Product.objects.filter(slug="clothing").exists())
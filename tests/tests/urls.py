@@ -1,5 +1,6 @@
 
 import ecommerce.models as resources
+import bookstore.models as bookstore
 from ecommerce.seed import seed_database
 from inspect import getmembers, isclass
 from django_instant_rest import patterns, casing
@@ -466,6 +467,13 @@ urlpatterns = [
     path("ecommerce/graphql/", GraphQLView.as_view(schema=schema)),
     path("ecommerce/seed", handle_seed_database),
     patterns.resource('products', resources.Product),
+    patterns.resource('authors', bookstore.Author, export=True),
+    patterns.resource('books', bookstore.Book),
+    patterns.resource('streamed-authors', bookstore.Author, stream=True),
+    patterns.resource('camel-books', bookstore.Book, camel=True, export=True),
+    patterns.resource('async-authors', bookstore.Author, is_async=True),
+    patterns.resource('async-streamed-authors', bookstore.Author, is_async=True, stream=True, export=True),
+    patterns.metrics('metrics'),
     # patterns.client('customers', resources.Customer),
 ]
 